@@ -1,22 +1,140 @@
+import os
 import uuid
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
 import re
 
+# -----------------------
+# Regeltabel
+# -----------------------
+# Every rule is matched case-insensitively as a plain substring, exactly like
+# the old `"..." in text_lower` checks. Add keywords here, not in analyse_lead.
+ISO_POINTS = 3
+
+ISO_RULES = (
+    ("ISO 27001", ("27001",)),
+    ("ISO 9001", ("9001",)),
+    ("ISO 14001", ("14001",)),
+)
+
+INDICATOR_RULES = (
+    ("urgentie", 2, ("deadline", "maand", "binnen", "spoed")),
+    ("budget", 2, ("budget", "gereserveerd", "investering")),
+    ("verplichting", 2, ("enterprise", "aanbesteding", "verplichting")),
+    ("volwassenheid", 1, ("risicoanalyse", "interne audit", "compliance team")),
+)
+
+
+# Up to this many keywords one C-level substring scan per keyword beats a
+# single regex pass over the text; above it the scans add up (crossover at
+# ~150 keywords, scripts/bench_analyse.py --extra-keywords)
+SCAN_MAX_KEYWORDS = 128
+
+
+class KeywordMatcher:
+    """Multi-keyword matcher whose cost does not grow with the rule table.
+
+    Small tables (the real one has 16 keywords) run one str.__contains__
+    scan per keyword, stopping each group at its first hit. Larger ones are
+    folded into a single trie-shaped regex: one pass over the text, which
+    ends as soon as every group has matched.
+    """
+
+    def __init__(self, rules, scan_max=SCAN_MAX_KEYWORDS):
+        groups_by_keyword = {}
+        for group, keywords in rules:
+            for keyword in keywords:
+                groups_by_keyword.setdefault(keyword.lower(), set()).add(group)
+
+        keywords_by_group = {}
+        for keyword, groups in groups_by_keyword.items():
+            for group in groups:
+                keywords_by_group.setdefault(group, []).append(keyword)
+        self._groups = tuple(keywords_by_group.items())
+
+        self._pattern = None
+        if len(groups_by_keyword) > scan_max:
+            trie = {}
+            for keyword in groups_by_keyword:
+                node = trie
+                for ch in keyword:
+                    node = node.setdefault(ch, {})
+                node[""] = {}
+
+            # The regex returns the longest keyword at a position; every
+            # shorter keyword that is a prefix of it matched there as well.
+            self._hits = {}
+            for keyword in groups_by_keyword:
+                hit = set()
+                for end in range(1, len(keyword) + 1):
+                    hit |= groups_by_keyword.get(keyword[:end], set())
+                self._hits[keyword] = frozenset(hit)
+            self._pattern = re.compile(_trie_pattern(trie))
+
+    def groups(self, text_lower: str) -> set:
+        found = set()
+        if self._pattern is None:
+            for group, keywords in self._groups:
+                for keyword in keywords:
+                    if keyword in text_lower:
+                        found.add(group)
+                        break
+            return found
+
+        # search() from one past each hit's start instead of finditer(), so
+        # overlapping keywords ("maandeadline") are found like `in` finds them
+        search = self._pattern.search
+        pos = 0
+        while len(found) < len(self._groups):
+            m = search(text_lower, pos)
+            if m is None:
+                break
+            found |= self._hits[m.group()]
+            pos = m.start() + 1
+        return found
+
+
+def _trie_pattern(node) -> str:
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        body = "(?:" + body + ")?"
+    return body
+
+
+_MATCHER = KeywordMatcher(
+    [(norm, keywords) for norm, keywords in ISO_RULES]
+    + [(name, keywords) for name, _, keywords in INDICATOR_RULES]
+)
+
+
+def kans_for_score(score: int) -> str:
+    if score >= 8:
+        return "Hoog"
+    if score >= 5:
+        return "Gemiddeld"
+    return "Laag"
+
+
+def actie_for_score(score: int) -> str:
+    if score >= 5:
+        return "Advies: plan een strategische intake en start met een gestructureerde gap-analyse."
+    return "Advies: kwalificeer verder via een oriënterend gesprek en informatieverstrekking."
+
+
 def analyse_lead(text: str):
 
     text_lower = text.lower()
+    hits = _MATCHER.groups(text_lower)
 
     # -----------------------
     # ISO detectie
     # -----------------------
-    iso_list = []
-
-    if "27001" in text_lower:
-        iso_list.append("ISO 27001")
-    if "9001" in text_lower:
-        iso_list.append("ISO 9001")
-    if "14001" in text_lower:
-        iso_list.append("ISO 14001")
+    iso_list = [norm for norm, _ in ISO_RULES if norm in hits]
 
     iso_norm = ", ".join(sorted(iso_list)) if iso_list else "Niet expliciet benoemd"
 
@@ -26,19 +144,11 @@ def analyse_lead(text: str):
     score = 0
 
     if iso_list:
-        score += 3
-
-    if any(word in text_lower for word in ["deadline", "maand", "binnen", "spoed"]):
-        score += 2
+        score += ISO_POINTS
 
-    if any(word in text_lower for word in ["budget", "gereserveerd", "investering"]):
-        score += 2
-
-    if any(word in text_lower for word in ["enterprise", "aanbesteding", "verplichting"]):
-        score += 2
-
-    if any(word in text_lower for word in ["risicoanalyse", "interne audit", "compliance team"]):
-        score += 1
+    for name, points, _ in INDICATOR_RULES:
+        if name in hits:
+            score += points
 
     # 🔒 Minimum logica
     if score == 0:
@@ -46,12 +156,7 @@ def analyse_lead(text: str):
     else:
         final_score = max(score, 3)
 
-    if final_score >= 8:
-        kans = "Hoog"
-    elif final_score >= 5:
-        kans = "Gemiddeld"
-    else:
-        kans = "Laag"
+    kans = kans_for_score(final_score)
 
     confidence = min(final_score * 10, 100)
 
@@ -74,12 +179,7 @@ def analyse_lead(text: str):
         f"en de totale leadscore bedraagt {final_score}/10."
     )
 
-    aanbevolen_actie = (
-        "Advies: plan een strategische intake en start met een gestructureerde gap-analyse."
-        if final_score >= 5
-        else
-        "Advies: kwalificeer verder via een oriënterend gesprek en informatieverstrekking."
-    )
+    aanbevolen_actie = actie_for_score(final_score)
 
     return {
         "reference_id": reference_id,
@@ -90,4 +190,61 @@ def analyse_lead(text: str):
         "confidence": confidence,
         "samenvatting": samenvatting,
         "aanbevolen_actie": aanbevolen_actie
-    }
\ No newline at end of file
+    }
+
+
+# -----------------------
+# Dedup + analysis cache
+# -----------------------
+ANALYSIS_CACHE_SIZE = int(os.environ.get("LEADS_ANALYSIS_CACHE_SIZE", "4096"))
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """Bounded LRU of analyse_lead results keyed on text_hash().
+
+    Texts that only differ in case or whitespace share one analysis, so the
+    analysis runs on the normalized text the key is computed from (a
+    keyword split by a line break still matches). Every hit still gets its
+    own reference_id and created_at.
+    """
+
+    def __init__(self, size=ANALYSIS_CACHE_SIZE):
+        self.size = size
+        self.stats = {"hits": 0, "misses": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyse(self, text: str, key: str = None):
+        key = key or text_hash(text)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+
+        if cached is None:
+            cached = analyse_lead(normalize_text(text))
+            if self.size > 0:
+                with self._lock:
+                    self._entries[key] = cached
+                    while len(self._entries) > self.size:
+                        self._entries.popitem(last=False)
+
+        result = dict(cached)
+        result["reference_id"] = str(uuid.uuid4())[:8]
+        result["created_at"] = datetime.now().strftime("%Y-%m-%d %H:%M")
+        return result, key
+
+
+analysis_cache = AnalysisCache()
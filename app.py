@@ -1,64 +1,430 @@
 import os
-import sqlite3
-from flask import Flask, request, jsonify, render_template
-from agent import analyse_lead
+import io
+import csv
+import json
+import zlib
+import time
+import base64
+from datetime import datetime, timedelta
+from flask import Flask, Response, g, request, jsonify, render_template, send_file, stream_with_context, url_for
+from agent import analysis_cache, text_hash
+from db import (INSERT_LEAD_SQL, ISO_NORMS, detach_db, fts_query, get_db, init_app, init_db, iter_batches,
+                lead_row, lead_version, pool)
+from enrichment import enricher
+from lead_feed import FEED_FIELDS, feed
+from listing_cache import listing_cache
+from metrics import DB_ROWS, ERRORS, REQUEST_SECONDS, REQUESTS, STAGE_SECONDS, registry
+from reports import report_key, reports
+from retention import retention
+from writer import WRITE_BEHIND, WRITE_BEHIND_DURABLE, writer
 
 app = Flask(__name__)
 
-DB_NAME = "leads.db"
+init_app(app)
+
+registry.counter_callback(
+    "leads_analysis_cache_total", "Analysis cache lookups, by result.",
+    lambda: dict(analysis_cache.stats), ("result",))
+registry.counter_callback(
+    "leads_report_cache_total", "Report cache lookups and evictions, by result.",
+    lambda: dict(reports.cache.stats), ("result",))
+registry.counter_callback(
+    "leads_list_cache_total", "/leads page cache lookups, evictions and invalidations, by result.",
+    lambda: dict(listing_cache.stats), ("result",))
+registry.gauge("leads_list_cache_bytes", "Bytes held by the /leads page cache.", lambda: listing_cache.bytes)
+
+
+@app.before_request
+def start_background_tasks():
+    # Threads are started lazily so they live in the serving process
+    retention.ensure_started()
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or "unknown"
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    started = g.get("request_started")
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    return response
 
 
 # -----------------------------
-# Database init + optimization
+# Utility: Batch input
 # -----------------------------
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "5000"))
+
+
+def parse_batch_items():
+    # Accepts a JSON array (of strings or {"text": ...} objects),
+    # {"texts": [...], "dedup": bool, "durable": bool, "enrich_wait": bool} or
+    # an NDJSON body with one item per line. Unparseable NDJSON lines become
+    # per-item errors, not a failed batch.
+    dedup = dedup_enabled(request.args.get("dedup"))
+    durable = durable_requested(request.args.get("durable"))
+    enrich_wait = enrich_wait_requested(request.args.get("enrich_wait"))
+
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            if "dedup" in data:
+                dedup = dedup_enabled(data["dedup"])
+            if "durable" in data:
+                durable = durable_requested(data["durable"])
+            if "enrich_wait" in data:
+                enrich_wait = enrich_wait_requested(data["enrich_wait"])
+            data = data.get("texts", data.get("leads"))
+        if not isinstance(data, list):
+            raise ValueError("Verwacht een JSON-array met teksten")
+        return data, dedup, durable, enrich_wait
+
+    items = []
+    for line in request.get_data(as_text=True).splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            items.append(None)
+    if not items:
+        raise ValueError("Lege input")
+    return items, dedup, durable, enrich_wait
 
-    # Main table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS leads (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            reference_id TEXT UNIQUE,
-            created_at TEXT,
-            iso_norm TEXT,
-            lead_score INTEGER,
-            commerciele_kans TEXT,
-            confidence INTEGER,
-            samenvatting TEXT,
-            aanbevolen_actie TEXT
-        )
-    """)
 
-    # Performance indexes
-    c.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON leads(created_at)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_lead_score ON leads(lead_score)")
+# -----------------------------
+# Utility: Lead listing
+# -----------------------------
+LEADS_PAGE_DEFAULT = 100
+LEADS_PAGE_MAX = int(os.environ.get("LEADS_PAGE_MAX", "1000"))
+STREAM_FETCH_SIZE = 200
 
-    conn.commit()
-    conn.close()
+LEAD_LIST_FIELDS = ("reference_id", "created_at", "iso_norm", "lead_score", "commerciele_kans", "confidence")
+# Qualified: listings may join leads with lead_iso_norms or leads_fts
+LEAD_LIST_COLUMNS = ", ".join("leads." + field for field in LEAD_LIST_FIELDS)
 
 
-init_db()
+def parse_limit(value, default=LEADS_PAGE_DEFAULT, maximum=LEADS_PAGE_MAX):
+    if value is None or value == "":
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit moet een geheel getal zijn")
+    if not 1 <= limit <= maximum:
+        raise ValueError(f"limit moet tussen 1 en {maximum} liggen")
+    return limit
+
+
+def known_norm(value):
+    # "ISO 27001", "iso27001" and "27001" all name the same norm
+    compact = "".join(value.split()).lower()
+    for norm in ISO_NORMS:
+        if compact in (norm.replace(" ", "").lower(), norm.split()[-1]):
+            return norm
+    return None
+
+
+def lead_filters(args, norm_column=None):
+    # Returns WHERE fragments + params; the score range hits idx_lead_score.
+    # A known ISO norm is looked up in lead_iso_norms (as `norm_column` when
+    # the caller already joined it, see lead_listing); any other value keeps
+    # the substring match on iso_norm.
+    where = []
+    params = []
+
+    iso_norm = args.get("iso_norm")
+    if iso_norm:
+        norm = known_norm(iso_norm)
+        if norm and norm_column:
+            where.append(f"{norm_column} = ?")
+            params.append(norm)
+        elif norm:
+            where.append("leads.id IN (SELECT lead_id FROM lead_iso_norms WHERE norm = ?)")
+            params.append(norm)
+        else:
+            escaped = iso_norm.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("leads.iso_norm LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+
+    kans = args.get("commerciele_kans")
+    if kans:
+        where.append("leads.commerciele_kans = ?")
+        params.append(kans)
+
+    for name, op in (("min_score", ">="), ("max_score", "<=")):
+        value = args.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            score = int(value)
+        except ValueError:
+            raise ValueError(f"{name} moet een geheel getal zijn")
+        where.append(f"leads.lead_score {op} ?")
+        params.append(score)
+
+    return where, params
+
+
+def lead_listing(args):
+    # FROM clause, filters and (created_at, id) key columns for newest-first
+    # listings. With a norm filter the listing walks lead_iso_norms' primary
+    # key (norm, created_at, lead_id), which is already in that order.
+    if not known_norm(args.get("iso_norm") or ""):
+        where, params = lead_filters(args)
+        return "leads", where, params, ("leads.created_at", "leads.id")
+
+    where, params = lead_filters(args, norm_column="n.norm")
+    return "lead_iso_norms AS n JOIN leads ON leads.id = n.lead_id", where, params, ("n.created_at", "n.lead_id")
+
+
+def encode_cursor(created_at, lead_id):
+    raw = json.dumps([created_at, lead_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, lead_id = json.loads(raw)
+        return str(created_at), int(lead_id)
+    except (ValueError, TypeError):
+        raise ValueError("Ongeldige cursor")
+
+
+def stream_json_array(batches, fields=LEAD_LIST_FIELDS):
+    # Yields a JSON array in fetchmany-sized chunks instead of building it in memory
+    started = time.perf_counter()
+    count = 0
+    yield "["
+    first = True
+    for rows in batches:
+        chunk = ",".join(app.json.dumps(dict(zip(fields, row)), separators=(",", ":")) for row in rows)
+        yield chunk if first else "," + chunk
+        first = False
+        count += len(rows)
+    yield "]"
+    # Includes time the client takes to read the body
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage="leads_stream")
+    DB_ROWS.inc(count, op="read")
+
+
+def listing_etag(version):
+    # Changes with every write to leads (lead_version, read in the request's
+    # transaction, so a write another worker just finished is always seen)
+    # and per query string
+    query = zlib.crc32(request.query_string)
+    return f"{version}-{query:08x}"
+
+
+def listing_response(body, etag, headers):
+    response = Response(body, mimetype="application/json", headers=headers)
+    # no-cache: browsers keep the body and revalidate with If-None-Match
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 
 # -----------------------------
-# Utility: Cleanup old leads
+# Utility: Lead stream
 # -----------------------------
-def cleanup_old_leads(limit=100):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    c.execute("""
-        DELETE FROM leads
-        WHERE id NOT IN (
-            SELECT id FROM leads
-            ORDER BY created_at DESC
+# Every open stream holds a server thread (gthread), so they are capped per
+# worker; above the cap clients fall back to polling /leads with ETags.
+STREAM_MAX_CLIENTS = int(os.environ.get("LEADS_STREAM_MAX_CLIENTS", "4"))
+STREAM_MAX_SECONDS = float(os.environ.get("LEADS_STREAM_MAX_SECONDS", "300"))
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get("LEADS_STREAM_HEARTBEAT_SECONDS", "15"))
+STREAM_BACKLOG_ROWS = 500
+
+
+def fetch_feed_rows(after):
+    # Catch-up for clients further behind than the feed keeps in memory
+    with pool.connection() as conn:
+        return conn.execute(f"""
+            SELECT {", ".join(FEED_FIELDS)} FROM leads
+            WHERE id > ?
+            ORDER BY id
             LIMIT ?
-        )
-    """, (limit,))
+        """, (after, STREAM_BACKLOG_ROWS)).fetchall()
+
+
+def sse_events(after):
+    # id: is the lead id, so a reconnecting EventSource resumes through
+    # Last-Event-ID without gaps or repeats
+    deadline = time.monotonic() + STREAM_MAX_SECONDS
+    yield "retry: 2000\n\n"
+    while time.monotonic() < deadline:
+        rows = feed.wait_rows(after, STREAM_HEARTBEAT_SECONDS)
+        if rows is None:
+            rows = fetch_feed_rows(after)
+        if not rows:
+            # Keeps proxies from timing out and surfaces closed connections
+            yield ": ping\n\n"
+            continue
+        chunk = []
+        for row in rows:
+            lead = dict(zip(FEED_FIELDS[1:], row[1:]))
+            chunk.append(f"id: {row[0]}\nevent: lead\ndata: {app.json.dumps(lead, separators=(',', ':'))}\n\n")
+        after = rows[-1][0]
+        DB_ROWS.inc(len(rows), op="stream")
+        yield "".join(chunk)
+
+
+# Search hits are rendered with a snippet each, so pages are smaller
+SEARCH_PAGE_DEFAULT = 20
+SEARCH_SNIPPET_TOKENS = 16
+
+
+# -----------------------------
+# Utility: Export
+# -----------------------------
+EXPORT_FETCH_SIZE = 1000
+
+EXPORT_COLUMNS = "id, reference_id, created_at, iso_norm, lead_score, commerciele_kans, confidence, samenvatting, aanbevolen_actie"
+EXPORT_FIELDS = ("id", "reference_id", "created_at", "iso_norm", "lead_score",
+                 "commerciele_kans", "confidence", "samenvatting", "aanbevolen_actie")
+
+
+def export_chunks(batches, fmt):
+    for rows in batches:
+        DB_ROWS.inc(len(rows), op="export")
+        if fmt == "csv":
+            buf = io.StringIO()
+            csv.writer(buf, lineterminator="\n").writerows(rows)
+            yield buf.getvalue()
+        else:
+            yield "".join(
+                json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows
+            )
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# -----------------------------
+# Utility: Reports
+# -----------------------------
+LEAD_DETAIL_FIELDS = ("reference_id", "created_at", "iso_norm", "lead_score", "commerciele_kans",
+                      "confidence", "samenvatting", "aanbevolen_actie", "verrijking")
+
+
+def lead_detail(row):
+    lead = dict(zip(LEAD_DETAIL_FIELDS, row))
+    if lead["verrijking"] is None:
+        del lead["verrijking"]
+    else:
+        lead["verrijking"] = json.loads(lead["verrijking"])
+    return lead
+
+
+def fetch_lead(conn, reference_id):
+    row = conn.execute(f"""
+        SELECT {", ".join(LEAD_DETAIL_FIELDS)}
+        FROM leads
+        WHERE reference_id = ?
+    """, (reference_id,)).fetchone()
+    return lead_detail(row) if row else None
+
+
+def report_status_body(reference_id, key, status):
+    body = {"reference_id": reference_id, "report_key": key, "status": status}
+    if status == "ready":
+        body["download_url"] = url_for("download_report", reference_id=reference_id)
+    return body
+
+
+# -----------------------------
+# Utility: Dedup
+# -----------------------------
+# Opt-in per request ("dedup": true) or for every request with LEADS_DEDUP=1
+DEDUP_DEFAULT = os.environ.get("LEADS_DEDUP", "0") in ("1", "true", "True")
+DEDUP_WINDOW_MINUTES = int(os.environ.get("LEADS_DEDUP_WINDOW_MINUTES", "60"))
+
+
+def parse_flag(value, default):
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value in ("1", "true", "True")
+    return bool(value)
+
+
+def dedup_enabled(value):
+    return parse_flag(value, DEDUP_DEFAULT)
+
+
+def find_duplicate(conn, key, window_minutes=DEDUP_WINDOW_MINUTES):
+    since = (datetime.now() - timedelta(minutes=window_minutes)).strftime("%Y-%m-%d %H:%M")
+    row = conn.execute(f"""
+        SELECT {", ".join(LEAD_DETAIL_FIELDS)}
+        FROM leads
+        WHERE text_hash = ? AND created_at >= ?
+        ORDER BY created_at DESC
+        LIMIT 1
+    """, (key, since)).fetchone()
+    if row is None:
+        return None
+    lead = lead_detail(row)
+    lead["duplicate"] = True
+    return lead
+
+
+# -----------------------------
+# Utility: Enrichment
+# -----------------------------
+def enrich_wait_requested(value):
+    # By default the response goes out on the rule score; the LLM opinion
+    # follows in the stored lead (GET /leads/<reference_id>)
+    return parse_flag(value, False)
+
+
+def start_enrichment(pending, wait):
+    # pending: [(result, text, key)] for leads in the band. With `wait`, each
+    # result carries its verrijking before it is stored; otherwise it is
+    # marked pending and written to the row once the LLM answers.
+    futures = [enricher.submit(text, result, key) for result, text, key in pending]
+    if wait:
+        enricher.wait_all(futures)
+    for (result, _, _), future in zip(pending, futures):
+        result["verrijking"] = enricher.outcome(future) if future.done() else {"status": "pending"}
+    return [(result["reference_id"], future) for (result, _, _), future in zip(pending, futures)
+            if result["verrijking"]["status"] == "pending"]
+
+
+def finish_enrichment(background):
+    for reference_id, future in background:
+        enricher.store_when_done(future, reference_id)
 
-    conn.commit()
-    conn.close()
+
+# -----------------------------
+# Utility: Lead storage
+# -----------------------------
+def durable_requested(value):
+    # Only meaningful with write-behind; synchronous inserts always commit
+    return parse_flag(value, WRITE_BEHIND_DURABLE)
+
+
+def store_leads(conn, rows, durable=False, stage="insert"):
+    if WRITE_BEHIND:
+        # Returns once queued, or once committed when the caller asked for it
+        with STAGE_SECONDS.time(stage="enqueue"):
+            writer.submit(rows, wait=durable)
+        return
+
+    with STAGE_SECONDS.time(stage=stage):
+        conn.executemany(INSERT_LEAD_SQL, rows)
+    with STAGE_SECONDS.time(stage="commit"):
+        conn.commit()
+    DB_ROWS.inc(len(rows), op="insert")
+
+    retention.notify_inserted(len(rows))
+    feed.notify()
 
 
 # -----------------------------
@@ -79,73 +445,414 @@ def analyse_iso():
         if not text.strip():
             return jsonify({"error": "Lege input"}), 400
 
-        result = analyse_lead(text)
+        conn = get_db()
+        key = text_hash(text)
 
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
+        if dedup_enabled(data.get("dedup")):
+            existing = find_duplicate(conn, key)
+            if existing is not None:
+                return jsonify(existing)
 
-        # Insert with UNIQUE reference safeguard
-        c.execute("""
-            INSERT OR REPLACE INTO leads (
-                reference_id,
-                created_at,
-                iso_norm,
-                lead_score,
-                commerciele_kans,
-                confidence,
-                samenvatting,
-                aanbevolen_actie
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            result["reference_id"],
-            result["created_at"],
-            result["iso_norm"],
-            result["lead_score"],
-            result["commerciele_kans"],
-            result["confidence"],
-            result["samenvatting"],
-            result["aanbevolen_actie"]
-        ))
+        with STAGE_SECONDS.time(stage="analyse"):
+            result, key = analysis_cache.analyse(text, key)
 
-        conn.commit()
-        conn.close()
+        background = []
+        if enricher.wants(result):
+            background = start_enrichment([(result, text, key)], enrich_wait_requested(data.get("enrich_wait")))
 
-        cleanup_old_leads()
+        # Insert with UNIQUE reference safeguard
+        store_leads(conn, [lead_row(result, key, text)], durable_requested(data.get("durable")))
+        finish_enrichment(background)
 
         return jsonify(result)
 
     except Exception as e:
+        ERRORS.inc(endpoint="analyse_iso")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/iso/batch", methods=["POST"])
+def analyse_iso_batch():
+    try:
+        items, dedup, durable, enrich_wait = parse_batch_items()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Maximaal {BATCH_MAX_ITEMS} items per batch"}), 413
+
+    try:
+        conn = get_db()
+        results = []
+        stored = []
+        errors = 0
+        seen = {}
+
+        for index, item in enumerate(items):
+            text = item.get("text", "") if isinstance(item, dict) else item
+            if not isinstance(text, str):
+                results.append({"index": index, "error": "Ongeldige input"})
+                errors += 1
+                continue
+            if not text.strip():
+                results.append({"index": index, "error": "Lege input"})
+                errors += 1
+                continue
+
+            key = text_hash(text)
+            if dedup:
+                existing = seen.get(key) or find_duplicate(conn, key)
+                if existing is not None:
+                    results.append(dict(existing, duplicate=True))
+                    continue
+
+            try:
+                with STAGE_SECONDS.time(stage="analyse"):
+                    result, key = analysis_cache.analyse(text, key)
+            except Exception as e:
+                ERRORS.inc(endpoint="analyse_iso_batch")
+                results.append({"index": index, "error": str(e)})
+                errors += 1
+                continue
+
+            results.append(result)
+            stored.append((result, text, key))
+            seen[key] = result
+
+        background = start_enrichment([s for s in stored if enricher.wants(s[0])], enrich_wait)
+
+        rows = [lead_row(result, key, text) for result, text, key in stored]
+        if rows:
+            store_leads(conn, rows, durable, stage="batch_insert")
+        finish_enrichment(background)
+
+        return jsonify({
+            "count": len(results),
+            "stored": len(rows),
+            "errors": errors,
+            "results": results
+        })
+
+    except Exception as e:
+        ERRORS.inc(endpoint="analyse_iso_batch")
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/leads")
 def get_leads():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        source, where, params, (created, ident) = lead_listing(request.args)
+
+        cursor = request.args.get("cursor")
+        if cursor:
+            created_at, lead_id = decode_cursor(cursor)
+            where.append(f"{created} <= ? AND ({created} < ? OR {ident} < ?)")
+            params += [created_at, created_at, lead_id]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_db()
+    # Version, cursor peek and rows come from one read transaction: a write
+    # between them would otherwise let the cursor skip past rows never sent
+    conn.execute("BEGIN")
+
+    version = lead_version(conn)
+    etag = listing_etag(version)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304, headers={"Cache-Control": "no-cache"})
+        response.set_etag(etag, weak=True)
+        return response
+
+    key = request.query_string
+    cacheable = listing_cache.cacheable(limit)
+    page = listing_cache.get(key, version) if cacheable else None
+    if page is not None:
+        return cached_listing(page, etag)
+
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+
+    # Peek at the key of the page's last row (and whether one follows) first,
+    # so the next cursor can go out as a header before the rows are streamed.
+    with STAGE_SECONDS.time(stage="leads_cursor"):
+        edge = conn.execute(f"""
+            SELECT {created}, {ident} FROM {source}
+            {where_sql}
+            ORDER BY {created} DESC, {ident} DESC
+            LIMIT 2 OFFSET ?
+        """, params + [limit - 1]).fetchall()
+
+    page_sql = f"""
+        SELECT {LEAD_LIST_COLUMNS}
+        FROM {source}
+        {where_sql}
+        ORDER BY {created} DESC, {ident} DESC
+        LIMIT ?
+    """
+
+    headers = {}
+    if len(edge) == 2:
+        next_cursor = encode_cursor(edge[0][0], edge[0][1])
+        args = request.args.to_dict()
+        args["cursor"] = next_cursor
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{url_for("get_leads", **args)}>; rel="next"'
+
+    if not cacheable:
+        # The body outlives the app context; keep reading this connection's snapshot
+        conn = detach_db()
+        batches = iter_batches(page_sql, params + [limit], STREAM_FETCH_SIZE, conn=conn)
+        response = listing_response(stream_with_context(stream_json_array(batches)), etag, headers)
+        response.call_on_close(lambda: pool.release(conn))
+        return response
+
+    batches = iter_batches(page_sql, params + [limit], STREAM_FETCH_SIZE, conn=conn)
+    body = "".join(stream_json_array(batches)).encode("utf-8")
+    return cached_listing(listing_cache.put(key, version, body, headers), etag)
+
+
+def cached_listing(page, etag):
+    # Both encodings are prepared once per page; a hit only copies bytes
+    if request.accept_encodings["gzip"]:
+        response = listing_response(page.gzipped, etag, page.headers)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = listing_response(page.body, etag, page.headers)
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+@app.route("/leads/stream")
+def stream_leads():
+    # Server-Sent Events: one `lead` event per new lead, in insertion order.
+    # Starts after Last-Event-ID (reconnects) or ?after=<id>, else from now.
+    after = request.headers.get("Last-Event-ID") or request.args.get("after")
+    if after is not None and not after.isdigit():
+        return jsonify({"error": "after moet een lead-id zijn"}), 400
+    after = int(after) if after is not None else feed.latest_id()
+
+    if not feed.add_client(STREAM_MAX_CLIENTS):
+        return jsonify({"error": "Te veel open streams, gebruik /leads"}), 503, {"Retry-After": "30"}
+
+    response = Response(sse_events(after), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    # Runs when the server closes the response, also if the client left early
+    response.call_on_close(feed.remove_client)
+    return response
+
+
+@app.route("/leads/export")
+def export_leads():
+    fmt = request.args.get("format", "csv")
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format moet csv of ndjson zijn"}), 400
 
-    c.execute("""
-        SELECT reference_id, created_at, iso_norm,
-               lead_score, commerciele_kans, confidence
+    try:
+        where, params = lead_filters(request.args)
+        since = request.args.get("since")
+        if since:
+            if not since.isdigit():
+                raise ValueError("since moet een lead-id zijn")
+            where.append("id > ?")
+            params.append(int(since))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_db()
+
+    # Pin the upper bound first: the export is a consistent id range and the
+    # caller gets its next `since` watermark up front.
+    watermark = conn.execute("SELECT COALESCE(MAX(id), 0) FROM leads").fetchone()[0]
+    where.append("id <= ?")
+    params.append(watermark)
+
+    batches = iter_batches(f"""
+        SELECT {EXPORT_COLUMNS}
         FROM leads
-        ORDER BY created_at DESC
-        LIMIT 100
-    """)
-
-    rows = c.fetchall()
-    conn.close()
-
-    leads = []
-    for row in rows:
-        leads.append({
-            "reference_id": row[0],
-            "created_at": row[1],
-            "iso_norm": row[2],
-            "lead_score": row[3],
-            "commerciele_kans": row[4],
-            "confidence": row[5]
-        })
+        WHERE {" AND ".join(where)}
+        ORDER BY id
+    """, params, EXPORT_FETCH_SIZE)
+
+    def generate():
+        if fmt == "csv":
+            yield ",".join(EXPORT_FIELDS) + "\n"
+        yield from export_chunks(batches, fmt)
+
+    body = generate()
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = {
+        "X-Export-Watermark": str(watermark),
+        "Content-Disposition": f"attachment; filename=leads.{fmt}",
+    }
+
+    if request.args.get("gzip") in ("1", "true"):
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
+
+@app.route("/leads/stats")
+def lead_stats():
+    # Reads the trigger-maintained counters in lead_stats: cost grows with
+    # the number of buckets, not the number of leads.
+    days = request.args.get("days", "30")
+    if not days.isdigit():
+        return jsonify({"error": "days moet een getal zijn (0 = alles)"}), 400
+
+    since = ""
+    if int(days) > 0:
+        since = (datetime.now() - timedelta(days=int(days) - 1)).strftime("%Y-%m-%d")
+
+    rows = get_db().execute("""
+        SELECT dimension, bucket, count
+        FROM lead_stats
+        WHERE count > 0 AND (dimension != 'day' OR bucket >= ?)
+    """, (since,)).fetchall()
+
+    stats = {"total": 0, "commerciele_kans": {}, "iso_norm": {}, "lead_score": [], "per_day": []}
+    for dimension, bucket, count in rows:
+        if dimension == "total":
+            stats["total"] = count
+        elif dimension == "day":
+            stats["per_day"].append({"date": bucket, "count": count})
+        elif dimension == "lead_score":
+            stats["lead_score"].append({"score": int(bucket), "count": count})
+        else:
+            stats[dimension][bucket] = count
+
+    # Histogram in score order (buckets are stored as text)
+    stats["lead_score"].sort(key=lambda b: b["score"])
+    return jsonify(stats)
+
+
+@app.route("/leads/search")
+def search_leads():
+    # Ranked full-text search over the original text and the summary.
+    # ?from= / ?to= (YYYY-MM-DD, inclusive) narrow the period; the /leads
+    # filters apply as well. Pages by offset, since rank order has no stable key.
+    try:
+        query = fts_query(request.args.get("q", ""))
+        if not query:
+            raise ValueError("q is verplicht")
+        limit = parse_limit(request.args.get("limit"), default=SEARCH_PAGE_DEFAULT)
+        offset = request.args.get("offset", "0")
+        if not offset.isdigit():
+            raise ValueError("offset moet een geheel getal zijn")
+        offset = int(offset)
+
+        where, params = lead_filters(request.args)
+        for name, op, shift in (("from", ">=", 0), ("to", "<", 1)):
+            value = request.args.get(name)
+            if not value:
+                continue
+            try:
+                day = datetime.strptime(value, "%Y-%m-%d") + timedelta(days=shift)
+            except ValueError:
+                raise ValueError(f"{name} moet een datum zijn (YYYY-MM-DD)")
+            where.append(f"leads.created_at {op} ?")
+            params.append(day.strftime("%Y-%m-%d"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    where_sql = "".join(f" AND {clause}" for clause in where)
+
+    with STAGE_SECONDS.time(stage="search"):
+        rows = get_db().execute(f"""
+            SELECT {LEAD_LIST_COLUMNS},
+                   snippet(leads_fts, -1, '**', '**', '…', {SEARCH_SNIPPET_TOKENS}),
+                   bm25(leads_fts)
+            FROM leads_fts
+            JOIN leads ON leads.id = leads_fts.rowid
+            WHERE leads_fts MATCH ?{where_sql}
+            ORDER BY bm25(leads_fts), leads.id DESC
+            LIMIT ? OFFSET ?
+        """, [query] + params + [limit + 1, offset]).fetchall()
+
+    results = []
+    for row in rows[:limit]:
+        lead = dict(zip(LEAD_LIST_FIELDS, row))
+        lead["snippet"] = row[-2]
+        lead["rank"] = round(row[-1], 4)
+        results.append(lead)
+    DB_ROWS.inc(len(results), op="read")
+
+    response = jsonify(results)
+    if len(rows) > limit:
+        args = request.args.to_dict()
+        args["offset"] = offset + limit
+        response.headers["X-Next-Offset"] = str(offset + limit)
+        response.headers["Link"] = f'<{url_for("search_leads", **args)}>; rel="next"'
+    return response
+
+
+@app.route("/leads/<reference_id>")
+def get_lead(reference_id):
+    lead = fetch_lead(get_db(), reference_id)
+    if lead is None:
+        return jsonify({"error": "Lead niet gevonden"}), 404
+    return jsonify(lead)
+
+
+@app.route("/reports/<reference_id>", methods=["POST"])
+def request_report(reference_id):
+    lead = fetch_lead(get_db(), reference_id)
+    if lead is None:
+        return jsonify({"error": "Lead niet gevonden"}), 404
+
+    key, status = reports.submit(lead)
+    return jsonify(report_status_body(reference_id, key, status)), (200 if status == "ready" else 202)
+
+
+@app.route("/reports/<reference_id>")
+def report_status(reference_id):
+    lead = fetch_lead(get_db(), reference_id)
+    if lead is None:
+        return jsonify({"error": "Lead niet gevonden"}), 404
+
+    key, status, error = reports.status(lead)
+    body = report_status_body(reference_id, key, status)
+    if error:
+        body["error"] = error
+    return jsonify(body)
+
+
+@app.route("/reports/<reference_id>/pdf")
+def download_report(reference_id):
+    lead = fetch_lead(get_db(), reference_id)
+    if lead is None:
+        return jsonify({"error": "Lead niet gevonden"}), 404
+
+    key = report_key(lead)
+    path = reports.cache.get(key)
+    if path is None:
+        key, status, error = reports.status(lead)
+        return jsonify(report_status_body(reference_id, key, status)), 409
+
+    return send_file(
+        os.path.abspath(path),
+        mimetype="application/pdf",
+        download_name=f"ISO_Report_{reference_id}.pdf",
+        max_age=3600,
+        etag=key,
+    )
+
+
+@app.route("/ready")
+def ready():
+    # Readiness: this worker can reach the database and the schema exists
+    try:
+        get_db().execute("SELECT 1 FROM leads LIMIT 1").fetchall()
+    except Exception as e:
+        return jsonify({"status": "unavailable", "error": str(e), "pid": os.getpid()}), 503
+    return jsonify({"status": "ready", "pid": os.getpid()})
 
-    return jsonify(leads)
+
+@app.route("/metrics")
+def metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
 
 
 # -----------------------------
@@ -156,4 +863,7 @@ if __name__ == "__main__":
     port = int(os.environ.get("APP_PORT", "8000"))
     debug = os.environ.get("APP_DEBUG", "0") in ("1", "true", "True")
 
+    # Production (gunicorn.conf.py) runs this once in the master instead
+    init_db()
+
     app.run(host=host, port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,534 @@
+import os
+import json
+import atexit
+import queue
+import sqlite3
+from contextlib import contextmanager
+from flask import g
+
+from agent import ISO_RULES
+
+DB_NAME = os.environ.get("LEADS_DB", "leads.db")
+
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE", "256"))
+
+
+# -----------------------------
+# Connections
+# -----------------------------
+def connect(path=None):
+    # SQL strings are module-level constants, so the per-connection
+    # statement cache keeps them prepared across requests.
+    conn = sqlite3.connect(
+        path or DB_NAME,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    # INSERT OR REPLACE only fires the delete triggers on the replaced row
+    # (and so keeps lead_stats right) with recursive triggers on.
+    conn.execute("PRAGMA recursive_triggers = ON")
+    return conn
+
+
+class ConnectionPool:
+    """Keeps configured connections open between requests.
+
+    Connections are handed out LIFO so the hottest ones (warm page and
+    statement caches) are reused first. A pool inherited through fork() is
+    abandoned rather than reused: SQLite handles must not cross processes.
+    """
+
+    def __init__(self, path=None, size=POOL_SIZE):
+        self.path = path or DB_NAME
+        self.size = size
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._abandoned = []
+
+    def after_fork(self):
+        self._check_fork()
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            # Keep references so the parent's handles are never closed here
+            self._abandoned.append(self._idle)
+            self._idle = queue.LifoQueue(maxsize=self.size)
+            self._pid = os.getpid()
+
+    def acquire(self):
+        self._check_fork()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return connect(self.path)
+
+    def release(self, conn):
+        if self._pid != os.getpid():
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        if self._pid != os.getpid():
+            return
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+pool = ConnectionPool()
+atexit.register(pool.close_all)
+
+
+# -----------------------------
+# Flask integration
+# -----------------------------
+def get_db():
+    # One pooled connection per app context, returned on teardown
+    if "db" not in g:
+        g.db = pool.acquire()
+    return g.db
+
+
+def detach_db():
+    # Hands the request's connection, and any read transaction open on it,
+    # to a streamed body; whoever takes it must pool.release() it
+    return g.pop("db")
+
+
+def release_db(exc=None):
+    conn = g.pop("db", None)
+    if conn is not None:
+        pool.release(conn)
+
+
+def init_app(app):
+    app.teardown_appcontext(release_db)
+
+
+def iter_batches(sql, params=(), size=500, conn=None):
+    # Streamed response bodies are consumed after the app context (and with
+    # it get_db()'s connection) is torn down, so they hold a pooled
+    # connection of their own until the last row is sent or the client
+    # disconnects. A detach_db() connection is read as-is (same snapshot)
+    # and left to its owner.
+    if conn is not None:
+        yield from fetch_batches(conn.execute(sql, params), size)
+        return
+    with pool.connection() as conn:
+        yield from fetch_batches(conn.execute(sql, params), size)
+
+
+def fetch_batches(cursor, size):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+# -----------------------------
+# Database init + optimization
+# -----------------------------
+LEAD_INDEXES = {
+    "idx_created_at": "CREATE INDEX IF NOT EXISTS idx_created_at ON leads(created_at)",
+    "idx_lead_score": "CREATE INDEX IF NOT EXISTS idx_lead_score ON leads(lead_score)",
+    "idx_text_hash": "CREATE INDEX IF NOT EXISTS idx_text_hash ON leads(text_hash, created_at)",
+}
+
+# Columns added after the first release; existing databases get them via ALTER TABLE
+LEAD_MIGRATIONS = {
+    "text_hash": "ALTER TABLE leads ADD COLUMN text_hash TEXT",
+    "input_text": "ALTER TABLE leads ADD COLUMN input_text TEXT",
+    "verrijking": "ALTER TABLE leads ADD COLUMN verrijking TEXT",
+}
+
+
+def init_db():
+    with pool.connection() as conn:
+        create_schema(conn)
+
+
+def create_schema(conn):
+    c = conn.cursor()
+
+    # Main table
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS leads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reference_id TEXT UNIQUE,
+            created_at TEXT,
+            iso_norm TEXT,
+            lead_score INTEGER,
+            commerciele_kans TEXT,
+            confidence INTEGER,
+            samenvatting TEXT,
+            aanbevolen_actie TEXT,
+            text_hash TEXT,
+            input_text TEXT,
+            verrijking TEXT
+        )
+    """)
+
+    columns = {row[1] for row in c.execute("PRAGMA table_info(leads)")}
+    for column, statement in LEAD_MIGRATIONS.items():
+        if column not in columns:
+            c.execute(statement)
+
+    # Performance indexes
+    for statement in LEAD_INDEXES.values():
+        c.execute(statement)
+
+    create_version(conn)
+    create_stats(conn)
+    create_norms(conn)
+    create_search(conn)
+
+    conn.commit()
+
+
+# -----------------------------
+# Trigger-maintained tables
+# -----------------------------
+ISO_NORMS = tuple(norm for norm, _ in ISO_RULES)
+
+
+def norm_condition(row, norm):
+    # iso_norm is analyse_lead's ", "-joined list; match whole entries only
+    return f"', ' || COALESCE({row}.iso_norm, '') || ', ' LIKE '%, {norm}, %'"
+
+
+def leads_trigger(name, event, statements):
+    body = "\n    ".join(statements)
+    return f"CREATE TRIGGER {name} AFTER {event} ON leads BEGIN\n    {body}\nEND"
+
+
+def stale_triggers(conn, wanted):
+    # Names of triggers that are missing or differ from their generated SQL
+    existing = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall())
+    return [name for name, sql in wanted.items() if existing.get(name) != sql]
+
+
+def install_triggers(conn, wanted):
+    # Triggers are generated from ISO_RULES. Returns True when any of them
+    # was missing or out of date (all are then recreated), so the caller
+    # can rebuild the table they maintain in the same transaction.
+    if not stale_triggers(conn, wanted):
+        return False
+
+    for name, statement in wanted.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(statement)
+    return True
+
+
+def drop_triggers(conn, names):
+    for name in names:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+# -----------------------------
+# Write version
+# -----------------------------
+# One counter bumped by every insert, update and delete on leads, in the
+# writing transaction. Unlike PRAGMA data_version (which only compares
+# within one connection) it means the same in every process, so /leads
+# can derive its ETag from it on the request's own connection.
+LEAD_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS lead_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+"""
+
+VERSION_BUMP = "UPDATE lead_version SET version = version + 1;"
+
+VERSION_TRIGGERS = {
+    f"lead_version_{event.lower()}": leads_trigger(f"lead_version_{event.lower()}", event, [VERSION_BUMP])
+    for event in ("INSERT", "UPDATE", "DELETE")
+}
+
+
+def create_version(conn):
+    conn.execute(LEAD_VERSION_TABLE)
+    conn.execute("INSERT OR IGNORE INTO lead_version (id, version) VALUES (1, 0)")
+    if install_triggers(conn, VERSION_TRIGGERS):
+        # Writes made while the triggers were missing went uncounted
+        conn.execute(VERSION_BUMP)
+
+
+def lead_version(conn):
+    return conn.execute("SELECT version FROM lead_version WHERE id = 1").fetchone()[0]
+
+
+# -----------------------------
+# Lead statistics
+# -----------------------------
+# lead_stats holds one counter per (dimension, bucket). Triggers keep it in
+# step with every insert and delete on leads, in the same transaction, so
+# /leads/stats reads a handful of rows instead of scanning the table.
+LEAD_STATS_TABLE = """
+    CREATE TABLE IF NOT EXISTS lead_stats (
+        dimension TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, bucket)
+    ) WITHOUT ROWID
+"""
+
+STATS_TRIGGERS = ("lead_stats_insert", "lead_stats_delete", "lead_stats_update")
+
+
+def stats_buckets(row):
+    # (dimension, bucket expression, condition) over the row alias `row`
+    # (NEW/OLD in triggers, leads in a rebuild). ISO norms come from the
+    # rule table; anything that matches none of them is counted as-is.
+    matches = [norm_condition(row, norm) for norm in ISO_NORMS]
+    buckets = [
+        ("total", "'all'", None),
+        ("commerciele_kans", f"COALESCE({row}.commerciele_kans, '')", None),
+        ("lead_score", f"COALESCE({row}.lead_score, 0)", None),
+        ("day", f"COALESCE(substr({row}.created_at, 1, 10), '')", None),
+    ]
+    buckets += [("iso_norm", f"'{norm}'", match) for norm, match in zip(ISO_NORMS, matches)]
+    buckets.append(("iso_norm", f"COALESCE({row}.iso_norm, '')", f"NOT ({' OR '.join(matches)})"))
+    return buckets
+
+
+def stats_trigger_sql():
+    increments = []
+    decrements = []
+    for dimension, bucket, condition in stats_buckets("NEW"):
+        where = f" WHERE {condition}" if condition else " WHERE 1"
+        increments.append(
+            f"INSERT INTO lead_stats (dimension, bucket, count) SELECT '{dimension}', {bucket}, 1{where} "
+            f"ON CONFLICT (dimension, bucket) DO UPDATE SET count = count + 1;"
+        )
+    for dimension, bucket, condition in stats_buckets("OLD"):
+        where = f" AND {condition}" if condition else ""
+        decrements.append(
+            f"UPDATE lead_stats SET count = count - 1 "
+            f"WHERE dimension = '{dimension}' AND bucket = {bucket}{where};"
+        )
+
+    return {
+        "lead_stats_insert": leads_trigger("lead_stats_insert", "INSERT", increments),
+        "lead_stats_delete": leads_trigger("lead_stats_delete", "DELETE", decrements),
+        "lead_stats_update": leads_trigger(
+            "lead_stats_update", "UPDATE OF created_at, iso_norm, lead_score, commerciele_kans",
+            decrements + increments),
+    }
+
+
+def drop_stats_triggers(conn):
+    drop_triggers(conn, STATS_TRIGGERS)
+
+
+def create_stats(conn):
+    conn.execute(LEAD_STATS_TABLE)
+    if install_triggers(conn, stats_trigger_sql()):
+        rebuild_stats(conn)
+
+
+def count_stats(conn):
+    counts = {}
+    for dimension, bucket, condition in stats_buckets("leads"):
+        where = f" WHERE {condition}" if condition else ""
+        for key, count in conn.execute(f"SELECT {bucket}, COUNT(*) FROM leads{where} GROUP BY 1"):
+            counts[(dimension, str(key))] = count
+    return counts
+
+
+def rebuild_stats(conn):
+    counts = count_stats(conn)
+    conn.execute("DELETE FROM lead_stats")
+    conn.executemany(
+        "INSERT INTO lead_stats (dimension, bucket, count) VALUES (?, ?, ?)",
+        [(dimension, bucket, count) for (dimension, bucket), count in counts.items()],
+    )
+    return counts
+
+
+def check_stats(conn):
+    # (dimension, bucket, stored, actual) for every counter that is off
+    actual = count_stats(conn)
+    stored = {
+        (dimension, bucket): count
+        for dimension, bucket, count in conn.execute("SELECT dimension, bucket, count FROM lead_stats WHERE count != 0")
+    }
+    return [
+        (key[0], key[1], stored.get(key, 0), actual.get(key, 0))
+        for key in sorted(set(actual) | set(stored))
+        if stored.get(key, 0) != actual.get(key, 0)
+    ]
+
+
+# -----------------------------
+# ISO norms per lead
+# -----------------------------
+# One row per (norm, lead), keyed in listing order, so "all ISO 27001 leads,
+# newest first" walks an index range instead of LIKE-scanning iso_norm.
+# iso_norm itself stays as the API's string representation.
+LEAD_NORMS_TABLE = """
+    CREATE TABLE IF NOT EXISTS lead_iso_norms (
+        norm TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        lead_id INTEGER NOT NULL,
+        PRIMARY KEY (norm, created_at, lead_id)
+    ) WITHOUT ROWID
+"""
+
+LEAD_NORMS_INDEX = "CREATE INDEX IF NOT EXISTS idx_lead_iso_norms_lead ON lead_iso_norms(lead_id)"
+
+NORM_TRIGGERS = ("lead_iso_norms_insert", "lead_iso_norms_delete", "lead_iso_norms_update")
+
+
+def norm_inserts(row, source):
+    return [
+        f"INSERT INTO lead_iso_norms (norm, created_at, lead_id) "
+        f"SELECT '{norm}', COALESCE({row}.created_at, ''), {row}.id{source} WHERE {norm_condition(row, norm)};"
+        for norm in ISO_NORMS
+    ]
+
+
+def norm_trigger_sql():
+    delete = ["DELETE FROM lead_iso_norms WHERE lead_id = OLD.id;"]
+    return {
+        "lead_iso_norms_insert": leads_trigger("lead_iso_norms_insert", "INSERT", norm_inserts("NEW", "")),
+        "lead_iso_norms_delete": leads_trigger("lead_iso_norms_delete", "DELETE", delete),
+        "lead_iso_norms_update": leads_trigger(
+            "lead_iso_norms_update", "UPDATE OF created_at, iso_norm", delete + norm_inserts("NEW", "")),
+    }
+
+
+def drop_norm_triggers(conn):
+    drop_triggers(conn, NORM_TRIGGERS)
+
+
+def create_norms(conn):
+    conn.execute(LEAD_NORMS_TABLE)
+    conn.execute(LEAD_NORMS_INDEX)
+    if install_triggers(conn, norm_trigger_sql()):
+        rebuild_norms(conn)
+
+
+def rebuild_norms(conn):
+    # Backfill for existing databases, bulk imports and rule changes
+    conn.execute("DELETE FROM lead_iso_norms")
+    for statement in norm_inserts("leads", " FROM leads"):
+        conn.execute(statement)
+
+
+# -----------------------------
+# Full-text search
+# -----------------------------
+# External-content FTS5 index over the original text and the summary; the
+# text itself is stored once, in leads.
+LEADS_FTS_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS leads_fts USING fts5(
+        input_text,
+        samenvatting,
+        content = 'leads',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+FTS_INSERT = "INSERT INTO leads_fts (rowid, input_text, samenvatting) VALUES (NEW.id, NEW.input_text, NEW.samenvatting);"
+FTS_DELETE = ("INSERT INTO leads_fts (leads_fts, rowid, input_text, samenvatting) "
+              "VALUES ('delete', OLD.id, OLD.input_text, OLD.samenvatting);")
+
+SEARCH_TRIGGERS = {
+    "leads_fts_insert": leads_trigger("leads_fts_insert", "INSERT", [FTS_INSERT]),
+    "leads_fts_delete": leads_trigger("leads_fts_delete", "DELETE", [FTS_DELETE]),
+    "leads_fts_update": leads_trigger("leads_fts_update", "UPDATE OF input_text, samenvatting", [FTS_DELETE, FTS_INSERT]),
+}
+
+
+def drop_search_triggers(conn):
+    drop_triggers(conn, SEARCH_TRIGGERS)
+
+
+def create_search(conn):
+    # New or changed triggers mean the index may be behind (new database,
+    # upgrade, bulk import): rebuild it from leads.
+    conn.execute(LEADS_FTS_TABLE)
+    if install_triggers(conn, SEARCH_TRIGGERS):
+        conn.execute("INSERT INTO leads_fts (leads_fts) VALUES ('rebuild')")
+
+
+def fts_query(text):
+    # Free text -> FTS5 query: every term quoted (so operators and
+    # punctuation cannot cause syntax errors), all terms required, and a
+    # trailing * kept as a prefix search.
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+# -----------------------------
+# Lead persistence
+# -----------------------------
+INSERT_LEAD_SQL = """
+    INSERT OR REPLACE INTO leads (
+        reference_id,
+        created_at,
+        iso_norm,
+        lead_score,
+        commerciele_kans,
+        confidence,
+        samenvatting,
+        aanbevolen_actie,
+        text_hash,
+        input_text,
+        verrijking
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# LLM enrichment that finished after the lead was stored (see enrichment.py)
+ENRICH_LEAD_SQL = "UPDATE leads SET verrijking = ? WHERE reference_id = ?"
+
+
+def lead_row(result, text_hash=None, input_text=None):
+    # "pending" ones are written by enrichment.py once the LLM has answered
+    verrijking = result.get("verrijking")
+    if not verrijking or verrijking.get("status") not in ("done", "failed"):
+        verrijking = None
+    return (
+        result["reference_id"],
+        result["created_at"],
+        result["iso_norm"],
+        result["lead_score"],
+        result["commerciele_kans"],
+        result["confidence"],
+        result["samenvatting"],
+        result["aanbevolen_actie"],
+        text_hash,
+        input_text,
+        json.dumps(verrijking, ensure_ascii=False) if verrijking else None
+    )
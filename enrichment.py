@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import atexit
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from agent import kans_for_score
+from db import ENRICH_LEAD_SQL, pool
+from metrics import STAGE_SECONDS, registry
+
+# Off unless LEADS_ENRICH=1. LEADS_ENRICH_URL points at any OpenAI-compatible
+# endpoint, e.g. scripts/stub_llm.py for offline runs.
+ENRICH_ENABLED = os.environ.get("LEADS_ENRICH", "0") in ("1", "true", "True")
+ENRICH_URL = os.environ.get("LEADS_ENRICH_URL", "")
+ENRICH_MODEL = os.environ.get("LEADS_ENRICH_MODEL", "gpt-4o-mini")
+ENRICH_CONCURRENCY = int(os.environ.get("LEADS_ENRICH_CONCURRENCY", "4"))
+ENRICH_TIMEOUT = float(os.environ.get("LEADS_ENRICH_TIMEOUT", "10"))
+ENRICH_RETRIES = int(os.environ.get("LEADS_ENRICH_RETRIES", "2"))
+ENRICH_CACHE_SIZE = int(os.environ.get("LEADS_ENRICH_CACHE_SIZE", "4096"))
+ENRICH_WAIT_TIMEOUT = float(os.environ.get("LEADS_ENRICH_WAIT_TIMEOUT", "15"))
+
+
+def parse_band(value):
+    # "3-6": rule scores 3 through 6 are uncertain enough for a second opinion
+    try:
+        low, high = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise ValueError(f"LEADS_ENRICH_BAND moet de vorm 'min-max' hebben, niet {value!r}")
+    return low, high
+
+
+ENRICH_BAND = parse_band(os.environ.get("LEADS_ENRICH_BAND", "3-6"))
+
+SYSTEM_PROMPT = (
+    "Je beoordeelt inkomende leads voor ISO-certificering (ISO 27001, 9001, 14001). "
+    "Een regelgebaseerde score twijfelt over deze lead. Antwoord alleen met JSON: "
+    '{"lead_score": 0-10, "commerciele_kans": "Laag" | "Gemiddeld" | "Hoog", '
+    '"toelichting": "maximaal twee zinnen"}'
+)
+
+
+def parse_enrichment(content, model):
+    data = json.loads(content.strip().strip("`").removeprefix("json"))
+    score = max(0, min(10, int(data["lead_score"])))
+    kans = data.get("commerciele_kans")
+    if kans not in ("Laag", "Gemiddeld", "Hoog"):
+        kans = kans_for_score(score)
+    return {
+        "status": "done",
+        "lead_score": score,
+        "commerciele_kans": kans,
+        "toelichting": str(data.get("toelichting", ""))[:500],
+        "model": model,
+    }
+
+
+class Enricher:
+    """Asks an LLM for a second opinion on leads in the uncertainty band.
+
+    Calls run on an asyncio loop in a background thread: at most
+    `concurrency` at a time, each with a timeout and retries on transient
+    errors. Results are cached per text hash, and concurrent requests for the
+    same text share one call.
+    """
+
+    def __init__(self, enabled=ENRICH_ENABLED, band=ENRICH_BAND, concurrency=ENRICH_CONCURRENCY,
+                 timeout=ENRICH_TIMEOUT, retries=ENRICH_RETRIES, cache_size=ENRICH_CACHE_SIZE):
+        self.enabled = enabled
+        self.band = band
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.cache_size = cache_size
+
+        self.stats = {"ok": 0, "cached": 0, "failed": 0, "timeouts": 0, "retries": 0}
+
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._store = None
+        self._pid = None
+
+    def wants(self, result):
+        low, high = self.band
+        return self.enabled and low <= result["lead_score"] <= high
+
+    # -----------------------------
+    # Producers
+    # -----------------------------
+    def ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # A loop inherited through fork() has no thread running it here
+            self._cache = OrderedDict()
+            self._inflight = {}
+            self._loop = asyncio.new_event_loop()
+            self._store = ThreadPoolExecutor(max_workers=1, thread_name_prefix="enrich-store")
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="lead-enricher", daemon=True)
+            self._thread.start()
+
+    def submit(self, text, result, key):
+        # Future resolving to the verrijking dict (never raises)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["cached"] += 1
+                future = Future()
+                future.set_result(cached)
+                return future
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+
+        self.ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._enrich(text, result), self._loop)
+        with self._lock:
+            self._inflight[key] = future
+        future.add_done_callback(lambda f, key=key: self._finished(key, f))
+        return future
+
+    def _finished(self, key, future):
+        verrijking = self.outcome(future)
+        with self._lock:
+            self._inflight.pop(key, None)
+            if verrijking["status"] == "done" and self.cache_size > 0:
+                self._cache[key] = verrijking
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def outcome(self, future):
+        # Verrijking of a finished future; calls cancelled at shutdown count as failed
+        if future.cancelled():
+            return {"status": "failed", "error": "CancelledError"}
+        return future.result()
+
+    def wait_all(self, futures, timeout=ENRICH_WAIT_TIMEOUT):
+        wait(futures, timeout=timeout)
+
+    def store_when_done(self, future, reference_id):
+        # The row may still sit in the write-behind queue; _store_result retries.
+        # Failed results are stored too, exactly as when the request waited.
+        def store(f):
+            if not f.cancelled():
+                self._store.submit(self._store_result, reference_id, f.result())
+
+        future.add_done_callback(store)
+
+    def stop(self, timeout=10.0):
+        # Lets running calls (and their UPDATEs) finish before the process exits
+        if self._thread is None or self._pid != os.getpid():
+            return
+        with self._lock:
+            pending = list(self._inflight.values())
+        wait(pending, timeout=timeout)
+        self._store.shutdown(wait=True)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+    def inflight(self):
+        return len(self._inflight)
+
+    # -----------------------------
+    # Event loop thread
+    # -----------------------------
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            # Warm up: importing openai takes longer than a typical call
+            self._client = self._make_client()
+        except Exception:
+            # e.g. no API key; every call then reports the error itself
+            self._client = None
+        self._loop.run_forever()
+
+    def _make_client(self):
+        from openai import AsyncOpenAI
+
+        api_key = os.environ.get("OPENAI_API_KEY") or ("local" if ENRICH_URL else None)
+        # Retries and timeouts are handled here, per call
+        return AsyncOpenAI(api_key=api_key, base_url=ENRICH_URL or None, max_retries=0, timeout=self.timeout)
+
+    async def _enrich(self, text, result):
+        import openai
+
+        transient = (asyncio.TimeoutError, openai.APIConnectionError, openai.RateLimitError,
+                     openai.InternalServerError)
+        async with self._semaphore:
+            error = None
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(min(0.25 * 2 ** attempt, 4.0))
+                started = time.perf_counter()
+                try:
+                    verrijking = await asyncio.wait_for(self._call(text, result), self.timeout)
+                    self.stats["ok"] += 1
+                    return verrijking
+                except transient as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.stats["timeouts"] += 1
+                    error = e
+                except Exception as e:
+                    # Bad request, auth or unparseable answer: retrying will not help
+                    error = e
+                    break
+                finally:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, stage="enrich")
+        self.stats["failed"] += 1
+        return {"status": "failed", "error": type(error).__name__}
+
+    async def _call(self, text, result):
+        if self._client is None:
+            self._client = self._make_client()
+        resp = await self._client.chat.completions.create(
+            model=ENRICH_MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": (
+                    f"Regelscore: {result['lead_score']}/10\n"
+                    f"ISO-norm(en): {result['iso_norm']}\n\n"
+                    f"Lead:\n{text[:4000]}"
+                )},
+            ],
+            temperature=0,
+        )
+        return parse_enrichment(resp.choices[0].message.content, ENRICH_MODEL)
+
+    def _store_result(self, reference_id, verrijking, attempts=5):
+        value = json.dumps(verrijking, ensure_ascii=False)
+        with pool.connection() as conn:
+            for attempt in range(attempts):
+                with conn:
+                    updated = conn.execute(ENRICH_LEAD_SQL, (value, reference_id)).rowcount
+                if updated:
+                    return
+                time.sleep(0.1 * (attempt + 1))
+
+
+enricher = Enricher()
+atexit.register(enricher.stop)
+
+registry.counter_callback(
+    "leads_enrich_total", "LLM enrichment calls, by result.", lambda: dict(enricher.stats), ("result",))
+registry.gauge(
+    "leads_enrich_inflight", "LLM enrichment calls queued or running.", enricher.inflight)
@@ -0,0 +1,47 @@
+# Production serving config: gunicorn -c gunicorn.conf.py app:app
+import os
+import multiprocessing
+
+bind = f"{os.environ.get('APP_HOST', '127.0.0.1')}:{os.environ.get('APP_PORT', '8000')}"
+
+# SQLite has a single writer, so a few processes with threads each beat
+# many single-threaded processes.
+workers = int(os.environ.get("WEB_WORKERS", str(min(4, multiprocessing.cpu_count() * 2))))
+threads = int(os.environ.get("WEB_THREADS", "8"))
+worker_class = "gthread"
+
+timeout = int(os.environ.get("WEB_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+pidfile = os.environ.get("WEB_PIDFILE", ".gunicorn.pid")
+accesslog = os.environ.get("WEB_ACCESSLOG", "-")
+errorlog = "-"
+
+# Workers import the app themselves after fork (no preload), so nothing
+# SQLite-related is ever shared between processes.
+preload_app = False
+
+
+def on_starting(server):
+    # Schema setup runs once, in the master, before any worker exists
+    from db import init_db, pool
+
+    init_db()
+    pool.close_all()
+
+
+def post_fork(server, worker):
+    from db import pool
+
+    pool.after_fork()
+
+
+def worker_exit(server, worker):
+    # Finish running LLM enrichments (their UPDATEs may wait on queued
+    # inserts), then commit anything still queued by the write-behind writer
+    from enrichment import enricher
+    from writer import writer
+
+    enricher.stop()
+    writer.stop()
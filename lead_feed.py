@@ -0,0 +1,156 @@
+import os
+import threading
+from collections import deque
+
+from db import connect
+from metrics import registry
+
+# How often each worker checks PRAGMA data_version for commits made by any
+# process (other workers, the write-behind writer, scripts/import_leads.py)
+FEED_POLL_MS = int(os.environ.get("LEADS_FEED_POLL_MS", "250"))
+# New rows kept in memory for streaming clients to catch up from
+FEED_RECENT_ROWS = int(os.environ.get("LEADS_FEED_RECENT_ROWS", "1000"))
+
+FEED_FIELDS = ("id", "reference_id", "created_at", "iso_norm", "lead_score", "commerciele_kans", "confidence")
+FEED_COLUMNS = ", ".join(FEED_FIELDS)
+
+
+class LeadFeed:
+    """Per-process view of what is new in the leads table.
+
+    One thread polls PRAGMA data_version on a dedicated connection; only when
+    it changes does it read MAX(id) and the new rows. /leads/stream clients
+    wait on that state in memory instead of polling SQLite themselves.
+    """
+
+    def __init__(self, poll_ms=FEED_POLL_MS, recent_rows=FEED_RECENT_ROWS):
+        self.poll = poll_ms / 1000
+        self.recent_rows = recent_rows
+
+        self.max_id = 0
+        self.clients = 0
+        # Rows with id > floor are all in `recent`
+        self._floor = 0
+        self._recent = deque(maxlen=recent_rows)
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._stop = False
+        self._thread = None
+        self._pid = None
+
+    # -----------------------------
+    # Readers
+    # -----------------------------
+    def ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop = False
+            self._ready.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name="lead-feed", daemon=True)
+            self._thread.start()
+        # The first state is read synchronously, so callers never see zeros
+        self._ready.wait(5.0)
+
+    def latest_id(self):
+        self.ensure_started()
+        return self.max_id
+
+    def notify(self):
+        # A local commit: check now instead of at the next poll
+        self._wake.set()
+
+    def wait_rows(self, after, timeout):
+        # Rows with id > after, waiting up to `timeout` for some to arrive.
+        # Returns None when they are no longer all in memory.
+        self.ensure_started()
+        with self._changed:
+            if self.max_id <= after:
+                self._changed.wait(timeout)
+            if self.max_id <= after:
+                return []
+            if after < self._floor:
+                return None
+            return [row for row in self._recent if row[0] > after]
+
+    def add_client(self, limit):
+        with self._lock:
+            if self.clients >= limit:
+                return False
+            self.clients += 1
+            return True
+
+    def remove_client(self):
+        with self._lock:
+            self.clients -= 1
+
+    def stop(self, timeout=5.0):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    # -----------------------------
+    # Poller thread
+    # -----------------------------
+    def _loop(self):
+        conn = connect()
+        version = None
+        try:
+            while not self._stop:
+                try:
+                    current = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if current != version:
+                        version = current
+                        self._refresh(conn)
+                except Exception:
+                    # Retried at the next poll; the state just stays as it was
+                    version = None
+                self._ready.set()
+                self._wake.wait(self.poll)
+                self._wake.clear()
+        finally:
+            conn.close()
+
+    def _refresh(self, conn):
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM leads").fetchone()[0]
+
+        rows = []
+        first_load = not self._ready.is_set()
+        if not first_load and max_id > self.max_id:
+            rows = conn.execute(f"""
+                SELECT {FEED_COLUMNS} FROM leads
+                WHERE id > ?
+                ORDER BY id DESC
+                LIMIT ?
+            """, (self.max_id, self.recent_rows)).fetchall()
+            rows.reverse()
+
+        with self._changed:
+            if first_load or max_id < self.max_id:
+                # Start (or the table was emptied/replaced): nothing to replay
+                self._recent.clear()
+                self._floor = max_id
+            elif rows:
+                if len(rows) == self.recent_rows:
+                    # More arrived than fit in memory; older ones come from the DB
+                    self._recent.clear()
+                    self._floor = rows[0][0] - 1
+                self._recent.extend(rows)
+                self._floor = max(self._floor, self._recent[0][0] - 1)
+            changed = max_id != self.max_id
+            self.max_id = max_id
+            if changed:
+                self._changed.notify_all()
+
+
+feed = LeadFeed()
+
+registry.gauge("leads_stream_clients", "Open /leads/stream connections in this process.", lambda: feed.clients)
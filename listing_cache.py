@@ -0,0 +1,74 @@
+import os
+import gzip
+import threading
+from collections import OrderedDict, namedtuple
+
+# Serialized pages (plain + gzip) kept per worker; 0 disables the cache
+LIST_CACHE_MAX_BYTES = int(os.environ.get("LEADS_LIST_CACHE_BYTES", str(8 * 1024 * 1024)))
+# Larger pages are streamed straight from SQLite instead of buffered
+LIST_CACHE_MAX_ROWS = int(os.environ.get("LEADS_LIST_CACHE_MAX_ROWS", "500"))
+
+CachedPage = namedtuple("CachedPage", "body gzipped headers size")
+
+
+class ListingCache:
+    """LRU (by bytes) of serialized /leads pages keyed on the query string.
+
+    All pages held were read at one lead_version, fetched in the same read
+    transaction as their rows. A request that sees another version (any
+    commit, from any process) drops the whole cache, so a page is never
+    served across a write.
+    """
+
+    def __init__(self, max_bytes=LIST_CACHE_MAX_BYTES, max_rows=LIST_CACHE_MAX_ROWS):
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0, "invalidated": 0}
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def cacheable(self, limit):
+        return self.max_bytes > 0 and limit <= self.max_rows
+
+    def get(self, key, version):
+        with self._lock:
+            self._switch(version)
+            page = self._entries.get(key)
+            if page is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return page
+
+    def put(self, key, version, body, headers):
+        gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+        page = CachedPage(body, gzipped, headers, len(key) + len(body) + len(gzipped))
+        if page.size > self.max_bytes:
+            return page
+
+        with self._lock:
+            self._switch(version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old.size
+            self._entries[key] = page
+            self.bytes += page.size
+            while self.bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self.bytes -= old.size
+                self.stats["evicted"] += 1
+        return page
+
+    def _switch(self, version):
+        if version == self._version:
+            return
+        self.stats["invalidated"] += len(self._entries)
+        self._entries.clear()
+        self.bytes = 0
+        self._version = version
+
+
+listing_cache = ListingCache()
@@ -0,0 +1,257 @@
+# log_digest.py — local compression of command output before summarization
+#
+# Every output line is streamed through a LogDigest, which keeps a bounded
+# picture of the whole run: repeated lines counted once, warnings collapsed
+# per category (e.g. the urllib3 NotOpenSSLWarning printed by every Python
+# child), error lines and tracebacks extracted, plus the first and last lines.
+# render() prints that picture by priority within a token budget; output that
+# is still too large for one request goes through map_reduce().
+
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional
+
+SUMMARY_TOKEN_BUDGET = int(os.environ.get("AGENT_SUMMARY_TOKEN_BUDGET", "3000"))
+SUMMARY_MAX_CHUNKS = int(os.environ.get("AGENT_SUMMARY_MAX_CHUNKS", "8"))
+
+HEAD_LINES = 10
+TAIL_LINES = 40
+MAX_DISTINCT = 20000
+MAX_ERRORS = 100
+MAX_TRACES = 10
+MAX_TRACE_LINES = 40
+MAX_WARNINGS = 50
+MAX_LINE_CHARS = 500
+
+WARNING_RE = re.compile(r"\b([A-Z]\w*Warning)\b")
+ERROR_RE = re.compile(
+    r"\b(error|errors|exception|failed|failure|fatal|critical|panic)\b|^E\s{2,}|^FAILED\b",
+    re.IGNORECASE,
+)
+TRACE_START = "Traceback (most recent call last):"
+# Standalone numbers, optionally with a unit: test_2 and py39 stay distinct,
+# "in 3.2 ms", "3.2ms", "0.12s" and "45%" do not
+VOLATILE_RE = re.compile(r"\b0x[0-9a-fA-F]+\b|(?<![\w.])\d+(?:\.\d+)*(?:ms|us|µs|ns|s|%)?(?!\w|\.\w)")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English/code
+    return (len(text) + 3) // 4
+
+
+def normalize(line: str) -> str:
+    # Lines differing only in numbers, timings or addresses count as repeats
+    return VOLATILE_RE.sub("#", line.strip())
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    if estimate_tokens(text) <= budget:
+        return text
+    keep = max(0, budget * 4 - 40)
+    return text[:keep] + f"\n... (truncated to ~{budget} tokens)"
+
+
+class LogDigest:
+    """Bounded, de-duplicated view of one command's output."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lines = 0
+        self.chars = 0
+        self._seen: Dict[str, int] = {}
+        self.untracked = 0
+        self.head: List[str] = []
+        # [latest line, normalized, consecutive similar lines]
+        self.tail: Deque[List] = deque(maxlen=TAIL_LINES)
+        # normalized -> [first example, count]
+        self.errors: "OrderedDict[str, List]" = OrderedDict()
+        self.warnings: "OrderedDict[str, List]" = OrderedDict()
+        # exception line (normalized) -> [lines, count]
+        self.traces: "OrderedDict[str, List]" = OrderedDict()
+        self._trace: Optional[Deque[str]] = None
+        self._last_warning: Optional[str] = None
+
+    # -----------------------------
+    # Feeding
+    # -----------------------------
+    def feed(self, line: str) -> None:
+        with self._lock:
+            self._feed(line.rstrip("\n"))
+
+    def feed_text(self, text: str) -> None:
+        for line in text.splitlines():
+            self.feed(line)
+
+    def _feed(self, line: str) -> None:
+        self.lines += 1
+        self.chars += len(line) + 1
+        if not line.strip():
+            return
+
+        if self._trace is not None:
+            self._trace.append(line)
+            if line[:1] in (" ", "\t") or line.startswith(TRACE_START):
+                return
+            # First unindented line is the exception itself: trace complete
+            self._close_trace(line)
+            return
+        if line.startswith(TRACE_START):
+            self._trace = deque([line], maxlen=MAX_TRACE_LINES)
+            return
+
+        stripped = line.strip()
+        if self._last_warning and stripped.startswith("warnings.warn("):
+            # Second line of a Python warning, counted with the first
+            return
+        self._last_warning = None
+
+        key = normalize(line)
+        count = self._seen.get(key)
+        if count is None and len(self._seen) >= MAX_DISTINCT:
+            self.untracked += 1
+        else:
+            self._seen[key] = (count or 0) + 1
+
+        warning = WARNING_RE.search(line)
+        if warning:
+            self._last_warning = warning.group(1)
+            self._bump(self.warnings, warning.group(1), stripped, MAX_WARNINGS)
+            # Shown once, collapsed, instead of between the other lines
+            return
+        if ERROR_RE.search(line):
+            self._bump(self.errors, key, stripped, MAX_ERRORS)
+
+        if len(self.head) < HEAD_LINES:
+            self.head.append(line)
+        if self.tail and self.tail[-1][1] == key:
+            self.tail[-1][0] = line
+            self.tail[-1][2] += 1
+        else:
+            self.tail.append([line, key, 1])
+
+    def _close_trace(self, exception_line: str) -> None:
+        lines = list(self._trace)
+        self._trace = None
+        key = normalize(exception_line)
+        if key in self.traces:
+            self.traces[key][1] += 1
+        elif len(self.traces) < MAX_TRACES:
+            self.traces[key] = [lines, 1]
+        self._bump(self.errors, key, exception_line.strip(), MAX_ERRORS)
+
+    @staticmethod
+    def _bump(table: "OrderedDict[str, List]", key: str, example: str, limit: int) -> None:
+        if key in table:
+            table[key][1] += 1
+        elif len(table) < limit:
+            table[key] = [example, 1]
+
+    # -----------------------------
+    # Rendering
+    # -----------------------------
+    def stats(self) -> str:
+        distinct = len(self._seen) + self.untracked
+        return (f"{self.lines} lines, {distinct} distinct, "
+                f"{sum(c for _, c in self.errors.values())} error lines, "
+                f"{sum(c for _, c in self.warnings.values())} warnings, "
+                f"{sum(c for _, c in self.traces.values())} tracebacks")
+
+    def render(self, budget: Optional[int] = None) -> str:
+        with self._lock:
+            if self._trace is not None:
+                # Output ended inside a traceback
+                self._close_trace(self._trace[-1])
+            if self.lines == 0:
+                return ""
+
+            if self.lines <= TAIL_LINES and not (self.warnings or self.traces):
+                # Short output goes through as is (apart from collapsed repeats)
+                return _fit([_counted(line, c) for line, _, c in self.tail], budget)
+
+            sections = []
+            if self.errors:
+                sections.append(("errors", [_counted(e, c) for e, c in self.errors.values()]))
+            for lines, count in self.traces.values():
+                title = "traceback" + (f" (x{count})" if count > 1 else "")
+                sections.append((title, lines))
+            if self.warnings:
+                sections.append(("warnings (collapsed)", [
+                    f"{category} x{count}: {example[:300]}" for category, (example, count) in self.warnings.items()
+                ]))
+            if self.lines > TAIL_LINES:
+                sections.append(("first lines", list(self.head)))
+            if self.tail:
+                sections.append(("last lines", [_counted(line, c) for line, _, c in self.tail]))
+            stats = self.stats()
+
+        out = [f"[{stats}]"]
+        used = estimate_tokens(out[0])
+        for title, lines in sections:
+            header = f"-- {title} --"
+            if budget is not None and used + estimate_tokens(header) > budget:
+                out.append("... (budget reached)")
+                break
+            out.append(header)
+            used += estimate_tokens(header) + 1
+            body = _fit(lines, None if budget is None else budget - used)
+            out.append(body)
+            used += estimate_tokens(body) + 1
+        return "\n".join(out)
+
+
+def _counted(line: str, count: int) -> str:
+    return line if count == 1 else f"{line}  (x{count})"
+
+
+def _fit(lines: List[str], budget: Optional[int]) -> str:
+    out: List[str] = []
+    used = 0
+    for i, line in enumerate(lines):
+        if len(line) > MAX_LINE_CHARS:
+            line = line[:MAX_LINE_CHARS] + " ..."
+        cost = estimate_tokens(line) + 1
+        if budget is not None and used + cost > budget:
+            out.append(f"... ({len(lines) - i} more)")
+            break
+        out.append(line)
+        used += cost
+    return "\n".join(out)
+
+
+# -----------------------------
+# Map-reduce over oversized output
+# -----------------------------
+def split_chunks(text: str, budget: int) -> List[str]:
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+    for line in text.splitlines():
+        line = truncate_tokens(line, budget)
+        cost = estimate_tokens(line) + 1
+        if current and used + cost > budget:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(line)
+        used += cost
+    if current:
+        chunks.append("\n".join(current))
+    return chunks or [""]
+
+
+def map_reduce(text: str, budget: int, summarize: Callable[[str, bool], str], max_workers: int = 4) -> str:
+    # summarize(text, final): final=False condenses one part, final=True
+    # writes the answer. No single request exceeds the budget.
+    while True:
+        chunks = split_chunks(text, budget)
+        if len(chunks) == 1:
+            return summarize(chunks[0], True)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as ex:
+            partials = list(ex.map(lambda chunk: summarize(chunk, False), chunks))
+        merged = "\n\n".join(f"[part {i}/{len(chunks)}]\n{p.strip()}" for i, p in enumerate(partials, start=1))
+        if estimate_tokens(merged) >= estimate_tokens(text):
+            # Summaries that do not shrink would loop forever
+            return summarize(truncate_tokens(merged, budget), True)
+        text = merged
@@ -0,0 +1,137 @@
+# plan_cache.py — persistent cache of planner proposals for terminal_agent
+#
+# A plan is reused only for the same normalized goal in the same project
+# state (git HEAD, server up/down, hashes of the files plans depend on), so
+# a commit or a Makefile edit naturally invalidates it.
+
+import os
+import re
+import json
+import hashlib
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+PLAN_CACHE_TTL_HOURS = float(os.environ.get("AGENT_PLAN_CACHE_TTL_HOURS", "168"))
+PLAN_CACHE_SIZE = int(os.environ.get("AGENT_PLAN_CACHE_SIZE", "200"))
+
+# Files whose content shapes which commands make sense
+STATE_FILES = ("Makefile", "requirements.txt", "scripts")
+
+
+def normalize_goal(goal: str) -> str:
+    words = re.findall(r"[\w./-]+", goal.lower())
+    return " ".join(words)
+
+
+def git_head(root: Path) -> str:
+    # Read .git directly: no subprocess on the hot path
+    git = root / ".git"
+    try:
+        head = (git / "HEAD").read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+    if not head.startswith("ref: "):
+        return head
+    ref = head[5:]
+    try:
+        return (git / ref).read_text(encoding="utf-8").strip()
+    except OSError:
+        pass
+    try:
+        for line in (git / "packed-refs").read_text(encoding="utf-8").splitlines():
+            if line.endswith(" " + ref):
+                return line.split(" ", 1)[0]
+    except OSError:
+        pass
+    return ref
+
+
+def hash_files(root: Path, names: Iterable[str]) -> str:
+    digest = hashlib.sha256()
+    for name in names:
+        path = root / name
+        paths = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for p in paths:
+            if "__pycache__" in p.parts:
+                continue
+            digest.update(str(p.relative_to(root)).encode("utf-8"))
+            try:
+                digest.update(p.read_bytes())
+            except OSError:
+                digest.update(b"<missing>")
+    return digest.hexdigest()[:16]
+
+
+def project_state(root: Path, server_running: bool) -> Dict[str, Any]:
+    return {
+        "git_head": git_head(root),
+        "server_running": server_running,
+        "files": hash_files(root, STATE_FILES),
+    }
+
+
+class PlanCache:
+    """Goal + project state -> proposal, with TTL and LRU eviction."""
+
+    def __init__(self, path: Path, ttl_hours: float = PLAN_CACHE_TTL_HOURS, max_entries: int = PLAN_CACHE_SIZE):
+        self.path = Path(path)
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self._entries = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._entries, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def key(goal: str, state: Dict[str, Any]) -> str:
+        raw = json.dumps([normalize_goal(goal), state], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.time()
+        if self.ttl > 0 and now - entry["created"] > self.ttl:
+            del self._entries[key]
+            self._save()
+            return None
+        entry["last_used"] = now
+        entry["hits"] = entry.get("hits", 0) + 1
+        self._save()
+        return entry["plan"]
+
+    def put(self, key: str, goal: str, plan: Dict[str, Any]) -> None:
+        now = time.time()
+        self._entries[key] = {
+            "goal": normalize_goal(goal),
+            "plan": plan,
+            "created": now,
+            "last_used": now,
+            "hits": 0,
+        }
+        self._evict(now)
+        self._save()
+
+    def invalidate(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._save()
+
+    def _evict(self, now: float) -> None:
+        if self.ttl > 0:
+            for k in [k for k, e in self._entries.items() if now - e["created"] > self.ttl]:
+                del self._entries[k]
+        if len(self._entries) > self.max_entries:
+            by_use = sorted(self._entries, key=lambda k: self._entries[k]["last_used"])
+            for k in by_use[:len(self._entries) - self.max_entries]:
+                del self._entries[k]
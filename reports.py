@@ -0,0 +1,177 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+REPORT_CACHE_DIR = os.environ.get("LEADS_REPORT_CACHE_DIR", "reports_cache")
+REPORT_CACHE_MAX_BYTES = int(os.environ.get("LEADS_REPORT_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+REPORT_CACHE_MAX_FILES = int(os.environ.get("LEADS_REPORT_CACHE_MAX_FILES", "2000"))
+REPORT_WORKERS = int(os.environ.get("LEADS_REPORT_WORKERS", "2"))
+
+# The analysed fields a report is rendered from. reference_id and
+# created_at are left out on purpose so duplicate leads share one PDF.
+REPORT_FIELDS = ("iso_norm", "lead_score", "commerciele_kans", "confidence", "samenvatting", "aanbevolen_actie")
+
+
+def report_key(lead):
+    payload = json.dumps([lead[f] for f in REPORT_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_pdf(lead, path):
+    # Imported lazily: reportlab is only needed by the render workers
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    styles = getSampleStyleSheet()
+    story = [
+        Paragraph("ISO Enterprise Lead Report", styles["Title"]),
+        Paragraph(f"Datum: {datetime.now().strftime('%d-%m-%Y')}", styles["Normal"]),
+        Spacer(1, 12),
+        Paragraph(f"Lead Score: {lead['lead_score']}/10", styles["Normal"]),
+        Paragraph(f"ISO Norm(en): {escape(lead['iso_norm'])}", styles["Normal"]),
+        Paragraph(f"Commerciële Kans: {escape(lead['commerciele_kans'])}", styles["Normal"]),
+        Spacer(1, 12),
+        Paragraph("Samenvatting:", styles["Heading3"]),
+        Paragraph(escape(lead["samenvatting"] or ""), styles["Normal"]),
+        Spacer(1, 12),
+        Paragraph("Aanbevolen Actie:", styles["Heading3"]),
+        Paragraph(escape(lead["aanbevolen_actie"] or ""), styles["Normal"]),
+    ]
+    SimpleDocTemplate(path, pagesize=A4).build(story)
+
+
+class ReportCache:
+    """Content-addressed PDF store: <cache_dir>/<sha256>.pdf.
+
+    mtime doubles as the LRU clock (touched on every hit), so eviction also
+    works across worker processes sharing the directory.
+    """
+
+    def __init__(self, cache_dir=REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MAX_BYTES,
+                 max_files=REPORT_CACHE_MAX_FILES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return path
+
+    def put(self, key, lead):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            render_pdf(lead, tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+        return path
+
+    def evict(self):
+        # Other workers evict from the same directory concurrently: a file
+        # can vanish between listing, stat and remove. The render that
+        # triggered this has succeeded either way.
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".pdf"):
+                        try:
+                            st = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+        except FileNotFoundError:
+            return
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (total > self.max_bytes or len(entries) > self.max_files):
+            _, size, path = entries.pop(0)
+            total -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.stats["evicted"] += 1
+
+
+class ReportQueue:
+    """Renders reports on a background thread pool, one job per content key."""
+
+    def __init__(self, cache=None, workers=REPORT_WORKERS):
+        self.cache = cache or ReportCache()
+        self.workers = workers
+        self._lock = threading.RLock()
+        self._jobs = {}
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report")
+            self._jobs = {}
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, lead):
+        key = report_key(lead)
+        if self.cache.get(key):
+            return key, "ready"
+
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.done():
+                job = self._get_executor().submit(self.cache.put, key, dict(lead))
+                self._jobs[key] = job
+                job.add_done_callback(lambda f, key=key: self._finished(key, f))
+        return key, "pending"
+
+    def _finished(self, key, job):
+        # Successful jobs are represented by the cache file from here on;
+        # failed ones stay so their error can be reported.
+        if job.exception() is None:
+            with self._lock:
+                if self._jobs.get(key) is job:
+                    del self._jobs[key]
+
+    def status(self, lead):
+        key = report_key(lead)
+        if os.path.exists(self.cache.path(key)):
+            return key, "ready", None
+
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            return key, "missing", None
+        if not job.done():
+            return key, "pending", None
+        if job.exception() is not None:
+            return key, "failed", str(job.exception())
+        # Rendered but evicted again in the meantime
+        return key, "missing", None
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True)
+
+
+reports = ReportQueue()
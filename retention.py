@@ -0,0 +1,164 @@
+import os
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+
+from db import pool
+from lead_feed import feed
+from metrics import DB_ROWS, STAGE_SECONDS, registry
+
+# 0 disables a limit
+RETENTION_MAX_ROWS = int(os.environ.get("LEADS_RETENTION_MAX_ROWS", "100"))
+RETENTION_MAX_AGE_DAYS = int(os.environ.get("LEADS_RETENTION_MAX_AGE_DAYS", "0"))
+
+RETENTION_CHUNK_SIZE = int(os.environ.get("LEADS_RETENTION_CHUNK_SIZE", "500"))
+RETENTION_EVERY_INSERTS = int(os.environ.get("LEADS_RETENTION_EVERY_INSERTS", "100"))
+RETENTION_INTERVAL_SECONDS = float(os.environ.get("LEADS_RETENTION_INTERVAL_SECONDS", "60"))
+
+
+# (created_at, id) of the oldest row that survives the row limit
+WATERMARK_BY_ROWS_SQL = """
+    SELECT created_at, id FROM leads
+    ORDER BY created_at DESC, id DESC
+    LIMIT 1 OFFSET ?
+"""
+
+# Everything strictly older than the watermark, oldest first, one chunk
+DELETE_CHUNK_SQL = """
+    DELETE FROM leads
+    WHERE id IN (
+        SELECT id FROM leads
+        WHERE created_at <= ? AND (created_at < ? OR id < ?)
+        ORDER BY created_at, id
+        LIMIT ?
+    )
+"""
+
+
+class RetentionWorker:
+    """Prunes old leads off the request path.
+
+    Inserts only bump a counter; the worker thread wakes up every
+    `every_inserts` inserts or every `interval` seconds, computes a
+    (created_at, id) watermark and deletes below it in short transactions of
+    `chunk_size` rows so writers are never blocked for long.
+    """
+
+    def __init__(self, max_rows=RETENTION_MAX_ROWS, max_age_days=RETENTION_MAX_AGE_DAYS,
+                 chunk_size=RETENTION_CHUNK_SIZE, every_inserts=RETENTION_EVERY_INSERTS,
+                 interval=RETENTION_INTERVAL_SECONDS):
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self.chunk_size = chunk_size
+        self.every_inserts = every_inserts
+        self.interval = interval
+
+        self.stats = {
+            "runs": 0,
+            "rows_pruned": 0,
+            "errors": 0,
+            "last_run_at": None,
+            "last_run_ms": None,
+            "last_rows_pruned": 0,
+        }
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._pending = 0
+        self._thread = None
+        self._pid = None
+
+    # -----------------------------
+    # Triggers
+    # -----------------------------
+    def ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name="lead-retention", daemon=True)
+            self._thread.start()
+
+    def notify_inserted(self, count=1):
+        self.ensure_started()
+        with self._lock:
+            self._pending += count
+            if self._pending >= self.every_inserts:
+                self._pending = 0
+                self._wake.set()
+
+    def stop(self, timeout=5.0):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop:
+                break
+            try:
+                self.run_once()
+            except Exception:
+                self.stats["errors"] += 1
+
+    # -----------------------------
+    # Pruning
+    # -----------------------------
+    def watermark(self, conn):
+        marks = []
+
+        if self.max_rows > 0:
+            row = conn.execute(WATERMARK_BY_ROWS_SQL, (self.max_rows - 1,)).fetchone()
+            if row is not None:
+                marks.append((row[0], row[1]))
+
+        if self.max_age_days > 0:
+            cutoff = datetime.now() - timedelta(days=self.max_age_days)
+            marks.append((cutoff.strftime("%Y-%m-%d %H:%M"), 0))
+
+        return max(marks) if marks else None
+
+    def run_once(self):
+        started = time.perf_counter()
+        pruned = 0
+
+        with pool.connection() as conn:
+            mark = self.watermark(conn)
+            while mark is not None:
+                with conn:
+                    cur = conn.execute(DELETE_CHUNK_SQL, (mark[0], mark[0], mark[1], self.chunk_size))
+                pruned += cur.rowcount
+                if cur.rowcount < self.chunk_size:
+                    break
+
+        if pruned:
+            feed.notify()
+
+        self.stats["runs"] += 1
+        self.stats["rows_pruned"] += pruned
+        self.stats["last_rows_pruned"] = pruned
+        self.stats["last_run_at"] = datetime.now().isoformat(timespec="seconds")
+        self.stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="retention")
+        DB_ROWS.inc(pruned, op="delete")
+        return pruned
+
+
+retention = RetentionWorker()
+atexit.register(retention.stop)
+
+registry.counter_callback(
+    "leads_retention_runs_total", "Background retention runs.", lambda: retention.stats["runs"])
+registry.counter_callback(
+    "leads_retention_deleted_rows_total", "Rows deleted by retention.", lambda: retention.stats["rows_pruned"])
+registry.counter_callback(
+    "leads_retention_errors_total", "Failed retention runs.", lambda: retention.stats["errors"])
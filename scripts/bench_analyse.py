@@ -0,0 +1,251 @@
+import argparse
+import gc
+import json
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent import INDICATOR_RULES, ISO_RULES, KeywordMatcher, analyse_lead  # noqa: E402
+
+FILLER = (
+    "wij zijn een organisatie met medewerkers in de regio en werken voor klanten in "
+    "zorg logistiek productie en dienstverlening we zoeken ondersteuning bij processen "
+    "kwaliteit beleid documentatie planning overleg projecten team afdeling"
+).split()
+
+# name -> (approximate size in bytes, iterations per repeat)
+CORPORA = {
+    "form": (300, 2000),
+    "email": (8 * 1024, 300),
+    "tender": (2 * 1024 * 1024, 2),
+}
+
+
+# -----------------------------
+# Corpora
+# -----------------------------
+def all_keywords():
+    return [kw for _, kws in ISO_RULES for kw in kws] + [kw for _, _, kws in INDICATOR_RULES for kw in kws]
+
+
+def make_text(size, density, rnd):
+    # density = share of words drawn from the rule keywords
+    keywords = all_keywords()
+    words = []
+    length = 0
+    while length < size:
+        word = rnd.choice(keywords) if rnd.random() < density else rnd.choice(FILLER)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+# -----------------------------
+# Engines: text_lower -> set of hit groups
+# -----------------------------
+def rule_groups(extra_keywords, rnd):
+    # The real rule table, optionally padded with synthetic keyword groups to
+    # see how each engine scales with the size of the rule set.
+    groups = [(norm, kws) for norm, kws in ISO_RULES] + [(name, kws) for name, _, kws in INDICATOR_RULES]
+    for i in range(extra_keywords):
+        word = "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rnd.randint(6, 12)))
+        groups.append((f"extra{i // 4}", (word,)))
+    return groups
+
+
+def legacy_engine(groups):
+    # The pre-compiled implementation: one `in` sweep per keyword
+    def match(text_lower):
+        found = set()
+        for group, keywords in groups:
+            if group not in found and any(word in text_lower for word in keywords):
+                found.add(group)
+        return found
+    return match
+
+
+def alternation_engine(groups):
+    # One flat lookahead alternation (no trie), for comparison with the compiled matcher
+    group_of = {}
+    for group, keywords in groups:
+        for kw in keywords:
+            group_of.setdefault(kw, set()).add(group)
+    pattern = re.compile("(?=(%s))" % "|".join(re.escape(k) for k in sorted(group_of, key=len, reverse=True)))
+
+    def match(text_lower):
+        found = set()
+        for m in pattern.finditer(text_lower):
+            found |= group_of[m.group(1)]
+        return found
+    return match
+
+
+def compiled_engine(groups):
+    # agent.KeywordMatcher as analyse_lead uses it
+    return KeywordMatcher(groups).groups
+
+
+ENGINES = {
+    "compiled": compiled_engine,
+    "legacy": legacy_engine,
+    "alternation": alternation_engine,
+}
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+def time_call(fn, arg, iterations, repeats):
+    fn(arg)  # warm-up
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                fn(arg)
+            samples.append((time.perf_counter() - started) / iterations)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return samples
+
+
+def peak_alloc(fn, arg):
+    tracemalloc.start()
+    try:
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def bench_case(label, text, iterations, repeats, engines):
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    text_lower = text.lower()
+
+    results = {}
+    reference = None
+    for name, fn in [("analyse_lead", analyse_lead)] + [(f"engine:{n}", e) for n, e in engines.items()]:
+        arg = text if name == "analyse_lead" else text_lower
+        samples = time_call(fn, arg, iterations, repeats)
+        median = statistics.median(samples)
+        results[name] = {
+            "median_us": round(median * 1e6, 2),
+            "min_us": round(min(samples) * 1e6, 2),
+            "stdev_us": round(statistics.pstdev(samples) * 1e6, 2),
+            "ms_per_mb": round(median * 1000 / size_mb, 3) if size_mb else None,
+            "peak_alloc_bytes": peak_alloc(fn, arg),
+        }
+        if name.startswith("engine:"):
+            hits = fn(text_lower)
+            if reference is None:
+                reference = hits
+            results[name]["agrees"] = hits == reference
+
+    return {"case": label, "bytes": len(text.encode("utf-8")), "results": results}
+
+
+def bench_scaling(sizes, repeats, seed):
+    # Compiled engine on the no-hit tender text (every keyword is searched in
+    # full) with the rule set padded to each size: median seconds per size
+    text = make_text(CORPORA["tender"][0], 0, random.Random(seed)).lower()
+    timings = {}
+    for extra in sizes:
+        match = compiled_engine(rule_groups(extra, random.Random(seed)))
+        timings[extra] = statistics.median(time_call(match, text, 1, repeats))
+    return timings
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Offline microbenchmarks for agent.analyse_lead")
+    p.add_argument("--corpora", default=",".join(CORPORA), help=f"subset of {','.join(CORPORA)}")
+    p.add_argument("--densities", default="0,0.001,0.01,0.1", help="keyword densities to test")
+    p.add_argument("--engines", default=",".join(ENGINES), help=f"subset of {','.join(ENGINES)}")
+    p.add_argument("--extra-keywords", type=int, default=0,
+                   help="pad the engines' rule set with N synthetic keywords (analyse_lead keeps the real rules)")
+    p.add_argument("--repeats", type=int, default=5, help="timing repeats per case (median is reported)")
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--budget-ms-per-mb", type=float, default=0,
+                   help="fail if analyse_lead on a >=1MB case exceeds this many ms per MB")
+    p.add_argument("--scaling", default="200,800",
+                   help="synthetic keyword counts for the rule-set scaling check (empty: skip)")
+    p.add_argument("--max-scaling", type=float, default=2.0,
+                   help="fail if the compiled engine is more than this many times slower on the largest "
+                        "--scaling rule set than on the smallest")
+    p.add_argument("--out", default="", help="write JSON results here (default: bench_results/<timestamp>.json)")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    rnd = random.Random(args.seed)
+    groups = rule_groups(args.extra_keywords, random.Random(args.seed))
+    engines = {name: ENGINES[name](groups) for name in args.engines.split(",")}
+
+    cases = []
+    for corpus in args.corpora.split(","):
+        size, iterations = CORPORA[corpus]
+        for density in (float(d) for d in args.densities.split(",")):
+            text = make_text(size, density, rnd)
+            label = f"{corpus}@{density:g}"
+            case = bench_case(label, text, iterations, args.repeats, engines)
+            cases.append(case)
+
+            line = "  ".join(f"{name}={r['median_us']:.1f}us" for name, r in case["results"].items())
+            print(f"{label:<16}{case['bytes']:>9}B  {line}")
+
+    scaling = {}
+    sizes = [int(n) for n in args.scaling.split(",") if n]
+    if sizes:
+        scaling = bench_scaling(sizes, args.repeats, args.seed)
+        real = len(all_keywords())
+        line = "  ".join(f"{real + extra}kw={seconds * 1000:.1f}ms" for extra, seconds in scaling.items())
+        print(f"{'scaling':<26}  {line}")
+
+    failures = []
+    if len(scaling) > 1:
+        smallest, largest = scaling[min(scaling)], scaling[max(scaling)]
+        if args.max_scaling and largest > smallest * args.max_scaling:
+            failures.append(f"scaling: compiled engine x{largest / smallest:.2f} from {min(scaling)} to "
+                            f"{max(scaling)} extra keywords > allowed x{args.max_scaling}")
+    for case in cases:
+        for name, r in case["results"].items():
+            if r.get("agrees") is False:
+                failures.append(f"{case['case']}: {name} disagrees with the first engine")
+        r = case["results"]["analyse_lead"]
+        if args.budget_ms_per_mb and case["bytes"] >= 1024 * 1024 and r["ms_per_mb"] > args.budget_ms_per_mb:
+            failures.append(f"{case['case']}: analyse_lead {r['ms_per_mb']} ms/MB > budget {args.budget_ms_per_mb}")
+
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": vars(args),
+        "cases": cases,
+        "scaling_ms": {str(extra): round(seconds * 1000, 2) for extra, seconds in scaling.items()},
+        "failures": failures,
+    }
+    out = Path(args.out or f"bench_results/{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"\nResults written to {out}")
+
+    for failure in failures:
+        print("FAIL:", failure)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,10 @@ if ! command -v python3 >/dev/null 2>&1; then
   exit 1
 fi
 
-if [[ -z "${OPENAI_API_KEY:-}" ]]; then
-  echo "ERROR: OPENAI_API_KEY is not set"
-  echo "Run: export OPENAI_API_KEY='sk-...'"
+# The key is only used by the optional LLM enrichment (LEADS_ENRICH=1)
+if [[ "${LEADS_ENRICH:-0}" == "1" && -z "${OPENAI_API_KEY:-}" && -z "${LEADS_ENRICH_URL:-}" ]]; then
+  echo "ERROR: LEADS_ENRICH=1 needs OPENAI_API_KEY or LEADS_ENRICH_URL"
+  echo "Run: export OPENAI_API_KEY='sk-...'  (or LEADS_ENRICH_URL=http://127.0.0.1:8765/v1 with scripts/stub_llm.py)"
   exit 1
 fi
 
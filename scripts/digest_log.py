@@ -0,0 +1,86 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from log_digest import SUMMARY_TOKEN_BUDGET, LogDigest, estimate_tokens, normalize  # noqa: E402
+
+# (lines that must collapse into one, lines that must stay distinct)
+NORMALIZE_CASES = [
+    ([f"PASSED tests/test_api.py::test_leads ({ms / 10:.1f}ms)" for ms in range(1, 1001)], []),
+    ([f"took {t}{unit}" for t in ("3", "0.12", "12.5") for unit in ("s", "ms", "us", "µs")], []),
+    ([f"cpu {pct}% mem 0x{addr:x}" for pct in (5, 45, 100) for addr in (0x7f3a, 0x10)], []),
+    (["done in 12ms.", "done in 3s."], []),
+    ([], ["test_2 passed", "test_3 passed"]),
+    ([], ["using py39", "using py310"]),
+    ([], ["0.12 seconds", "0.12 sessions"]),
+]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Compress a command log the way terminal_agent does before summarizing")
+    p.add_argument("path", nargs="?", help="log file (default: stdin)")
+    p.add_argument("--check", action="store_true",
+                   help="verify that lines differing only in numbers/timings collapse, then exit")
+    p.add_argument("--budget", type=int, default=SUMMARY_TOKEN_BUDGET,
+                   help=f"token budget for the digest (default: {SUMMARY_TOKEN_BUDGET})")
+    p.add_argument("--summarize", metavar="GOAL",
+                   help="also summarize via AGENT_PLANNER_URL / OpenAI (map-reduce when over budget)")
+    return p.parse_args()
+
+
+def check_normalize():
+    failed = 0
+    for same, distinct in NORMALIZE_CASES:
+        if same and len({normalize(line) for line in same}) != 1:
+            print(f"NOT COLLAPSED: {sorted({normalize(line) for line in same})[:5]}")
+            failed += 1
+        if distinct and len({normalize(line) for line in distinct}) != len(distinct):
+            print(f"MERGED: {distinct}")
+            failed += 1
+
+    # 1000 timing-only lines count as one distinct line and one collapsed tail entry
+    digest = LogDigest()
+    for line in NORMALIZE_CASES[0][0]:
+        digest.feed(line)
+    if not digest.stats().startswith("1000 lines, 1 distinct") or len(digest.tail) != 1:
+        print(f"timing-only output not collapsed: {digest.stats()}, {len(digest.tail)} tail entries")
+        failed += 1
+
+    print("normalize: OK" if not failed else f"normalize: {failed} check(s) failed")
+    return 1 if failed else 0
+
+
+def main():
+    args = parse_args()
+    if args.check:
+        raise SystemExit(check_normalize())
+
+    started = time.perf_counter()
+    digest = LogDigest()
+    stream = open(args.path, encoding="utf-8", errors="replace") if args.path else sys.stdin
+    with stream:
+        for line in stream:
+            digest.feed(line)
+    text = digest.render(args.budget)
+    elapsed = time.perf_counter() - started
+
+    print(text)
+    print(f"\n~{estimate_tokens('x' * digest.chars)} tokens in, ~{estimate_tokens(text)} tokens out "
+          f"({elapsed:.2f}s)", file=sys.stderr)
+
+    if args.summarize:
+        from terminal_agent import make_client, summarize_output
+
+        client = make_client()
+        if client is None:
+            raise SystemExit("No summarizer available (AGENT_OFFLINE is set)")
+        started = time.perf_counter()
+        print("\n" + summarize_output(client, args.summarize, text))
+        print(f"summarized in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import csv
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent import actie_for_score, analyse_lead, kans_for_score, normalize_text, text_hash  # noqa: E402
+from db import (DB_NAME, INSERT_LEAD_SQL, LEAD_INDEXES, connect, create_schema,  # noqa: E402
+                drop_norm_triggers, drop_search_triggers, drop_stats_triggers)
+from retention import RETENTION_MAX_ROWS  # noqa: E402
+
+# leads.csv layout (no header): created_at, iso_norm, samenvatting, lead_score, commerciele_kans
+CSV_FIELDS = ("created_at", "iso_norm", "samenvatting", "lead_score", "commerciele_kans")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Stream a leads CSV export into leads.db")
+    p.add_argument("csv", nargs="?", default="leads.csv", help="CSV file, '-' for stdin (default: leads.csv)")
+    p.add_argument("--db", default=DB_NAME, help=f"target database (default: {DB_NAME})")
+    p.add_argument("--rescore", action="store_true", help="re-run analyse_lead on the text column")
+    p.add_argument("--batch-size", type=int, default=10000, help="rows per transaction (default: 10000)")
+    p.add_argument("--keep-indexes", action="store_true",
+                   help="do not drop/rebuild indexes and stats triggers (use when the app is serving from the same DB)")
+    p.add_argument("--progress-every", type=int, default=100000, help="print progress every N rows")
+    return p.parse_args()
+
+
+def read_rows(f):
+    reader = csv.reader(f)
+    for line_no, cells in enumerate(reader, start=1):
+        if not cells or not any(c.strip() for c in cells):
+            continue
+        if line_no == 1 and cells[0].strip().lower() == "created_at":
+            continue
+        # Ragged rows: pad missing trailing columns (e.g. commerciele_kans)
+        cells = (cells + [""] * len(CSV_FIELDS))[:len(CSV_FIELDS)]
+        yield line_no, dict(zip(CSV_FIELDS, (c.strip() for c in cells)))
+
+
+def to_lead_row(rec, rescore):
+    if rescore:
+        # Same input as the API's analysis cache (see AnalysisCache)
+        result = analyse_lead(normalize_text(rec["samenvatting"]))
+        return (
+            uuid.uuid4().hex,
+            rec["created_at"] or result["created_at"],
+            result["iso_norm"],
+            result["lead_score"],
+            result["commerciele_kans"],
+            result["confidence"],
+            result["samenvatting"],
+            result["aanbevolen_actie"],
+            text_hash(rec["samenvatting"]),
+            rec["samenvatting"],
+            None,
+        )
+
+    score = int(rec["lead_score"])
+    return (
+        # Full uuid: 8-char ids collide long before a million rows
+        uuid.uuid4().hex,
+        rec["created_at"],
+        rec["iso_norm"] or "Niet expliciet benoemd",
+        score,
+        rec["commerciele_kans"] or kans_for_score(score),
+        min(score * 10, 100),
+        rec["samenvatting"],
+        actie_for_score(score),
+        text_hash(rec["samenvatting"]),
+        None,
+        None,
+    )
+
+
+def main():
+    args = parse_args()
+
+    conn = connect(args.db)
+    create_schema(conn)
+    conn.execute("PRAGMA cache_size = -65536")
+
+    if not args.keep_indexes:
+        for name in LEAD_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        # Per-row triggers cost more than one rebuild of their tables at the end
+        drop_stats_triggers(conn)
+        drop_norm_triggers(conn)
+        drop_search_triggers(conn)
+        conn.commit()
+
+    f = sys.stdin if args.csv == "-" else open(args.csv, newline="", encoding="utf-8")
+
+    imported = 0
+    skipped = 0
+    batch = []
+    started = time.perf_counter()
+    next_report = args.progress_every
+
+    def flush():
+        with conn:
+            conn.executemany(INSERT_LEAD_SQL, batch)
+        batch.clear()
+
+    try:
+        for line_no, rec in read_rows(f):
+            try:
+                batch.append(to_lead_row(rec, args.rescore))
+            except ValueError:
+                skipped += 1
+                print(f"skip line {line_no}: invalid lead_score {rec['lead_score']!r}", file=sys.stderr)
+                continue
+
+            if len(batch) >= args.batch_size:
+                imported += len(batch)
+                flush()
+
+            if imported + len(batch) >= next_report:
+                elapsed = time.perf_counter() - started
+                print(f"{imported + len(batch)} rows ({(imported + len(batch)) / elapsed:,.0f} rows/s)")
+                next_report += args.progress_every
+
+        if batch:
+            imported += len(batch)
+            flush()
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+        if not args.keep_indexes:
+            index_started = time.perf_counter()
+            create_schema(conn)
+            print(f"Indexes and derived tables rebuilt in {time.perf_counter() - index_started:.2f}s")
+
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    rate = imported / elapsed if elapsed > 0 else 0.0
+    print(f"Imported {imported} rows, skipped {skipped}, in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+
+    if RETENTION_MAX_ROWS > 0 and imported > RETENTION_MAX_ROWS:
+        print(f"NOTE: the app keeps only {RETENTION_MAX_ROWS} leads (LEADS_RETENTION_MAX_ROWS); "
+              f"raise or disable it before starting the server or the import will be pruned.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import json
+import math
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+from smoke_test import BASE, TEST_LEADS
+
+ENDPOINTS = ("iso", "leads", "batch")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Concurrent load test / traffic replay against a local server")
+    p.add_argument("mode", choices=("load", "replay"), nargs="?", default="load")
+    p.add_argument("--base", default=BASE, help=f"server base url (default: {BASE})")
+    p.add_argument("--clients", type=int, default=8, help="concurrent clients (default: 8)")
+    p.add_argument("--requests", type=int, default=500, help="total requests in load mode (default: 500)")
+    p.add_argument("--duration", type=float, default=0, help="stop after N seconds instead of --requests")
+    p.add_argument("--rate", type=float, default=0, help="max requests/s over all clients, 0 = unlimited")
+    p.add_argument("--mix", default="iso=70,leads=25,batch=5",
+                   help="endpoint weights for load mode (default: iso=70,leads=25,batch=5)")
+    p.add_argument("--batch-size", type=int, default=50, help="texts per /iso/batch call (default: 50)")
+    p.add_argument("--file", default="requests.jsonl", help="JSONL traffic for replay mode (default: requests.jsonl)")
+    p.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    p.add_argument("--out", default="", help="write JSON results here (default: load_results/<timestamp>.json)")
+    return p.parse_args()
+
+
+# -----------------------------
+# Workload
+# -----------------------------
+def parse_mix(spec):
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint in --mix: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def load_calls(args):
+    weights = parse_mix(args.mix)
+    names = list(weights)
+    texts = [t["text"] for t in TEST_LEADS]
+    rnd = random.Random(42)
+
+    count = 0
+    while args.duration or count < args.requests:
+        name = rnd.choices(names, [weights[n] for n in names])[0]
+        if name == "iso":
+            yield "iso", "POST", "/iso", {"text": rnd.choice(texts)}
+        elif name == "leads":
+            yield "leads", "GET", "/leads", None
+        else:
+            yield "batch", "POST", "/iso/batch", [rnd.choice(texts) for _ in range(args.batch_size)]
+        count += 1
+
+
+def replay_calls(args):
+    # Accepts recorded calls ({"method", "path", "json"}) and plain text
+    # records ({"text": ...} or {"body": "..."}), which are replayed as /iso.
+    with open(args.file, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            if "path" in rec:
+                method = rec.get("method", "GET").upper()
+                yield rec["path"].split("?")[0], method, rec["path"], rec.get("json")
+            else:
+                text = rec.get("text") or rec.get("body") or ""
+                yield "/iso", "POST", "/iso", {"text": text}
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+class Pacer:
+    """Spaces request starts evenly over all clients to cap the rate."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            slot = max(self._next, time.perf_counter())
+            self._next = slot + self.interval
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run(args, calls):
+    samples = {}
+    lock = threading.Lock()
+    local = threading.local()
+    pacer = Pacer(args.rate)
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    calls = iter(calls)
+
+    def next_call():
+        with lock:
+            if deadline and time.perf_counter() >= deadline:
+                return None
+            return next(calls, None)
+
+    def client():
+        local.session = requests.Session()
+        while True:
+            call = next_call()
+            if call is None:
+                return
+            name, method, path, body = call
+            pacer.wait()
+            started = time.perf_counter()
+            try:
+                r = local.session.request(method, args.base + path, json=body, timeout=args.timeout)
+                ok = r.status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples.setdefault(name, []).append((elapsed, ok))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as ex:
+        for _ in range(args.clients):
+            ex.submit(client)
+    wall = time.perf_counter() - started
+    return samples, wall
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+def summarize(samples, wall):
+    def stats(entries):
+        latencies = sorted(e for e, _ in entries)
+        errors = sum(1 for _, ok in entries if not ok)
+        ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+        return {
+            "requests": len(entries),
+            "errors": errors,
+            "throughput_rps": round(len(entries) / wall, 2) if wall else 0.0,
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "max_ms": ms(latencies[-1] if latencies else None),
+        }
+
+    per_endpoint = {name: stats(entries) for name, entries in sorted(samples.items())}
+    everything = [e for entries in samples.values() for e in entries]
+    return {"wall_seconds": round(wall, 3), "total": stats(everything), "endpoints": per_endpoint}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    args = parse_args()
+
+    print(f"== Load test ({args.mode}) ==")
+    print("Checking server...")
+    requests.get(args.base, timeout=10).raise_for_status()
+
+    calls = load_calls(args) if args.mode == "load" else replay_calls(args)
+    samples, wall = run(args, calls)
+    summary = summarize(samples, wall)
+
+    print(f"\n{'endpoint':<14}{'reqs':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, s in list(summary["endpoints"].items()) + [("TOTAL", summary["total"])]:
+        print(f"{name:<14}{s['requests']:>7}{s['errors']:>6}{s['throughput_rps']:>9}"
+              f"{s['p50_ms']!s:>9}{s['p95_ms']!s:>9}{s['p99_ms']!s:>9}")
+
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "config": vars(args),
+        **summary,
+    }
+    out = Path(args.out or f"load_results/{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResults written to {out}")
+
+    if summary["total"]["errors"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db import (DB_NAME, check_stats, connect, create_schema, rebuild_stats, stale_triggers,  # noqa: E402
+                stats_trigger_sql)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Check or rebuild the lead_stats summary table")
+    p.add_argument("--db", default=DB_NAME, help=f"database (default: {DB_NAME})")
+    p.add_argument("--check", action="store_true",
+                   help="only compare lead_stats with a full recount (read-only); exit 1 on drift")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    conn = connect(args.db)
+
+    started = time.perf_counter()
+    if args.check:
+        # No create_schema() here: it would reinstall missing triggers and
+        # rebuild lead_stats, hiding the drift this is meant to report
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'lead_stats'").fetchone():
+            print("lead_stats does not exist")
+            conn.close()
+            raise SystemExit(1)
+        stale = stale_triggers(conn, stats_trigger_sql())
+        for name in stale:
+            print(f"trigger {name} is missing or out of date")
+        drift = check_stats(conn)
+        for dimension, bucket, stored, actual in drift:
+            print(f"{dimension:<18}{bucket:<28} stored={stored:<8} actual={actual}")
+        print(f"{len(drift)} counters off, {len(stale)} triggers stale ({time.perf_counter() - started:.2f}s)")
+        conn.close()
+        if drift or stale:
+            raise SystemExit(1)
+        return
+
+    create_schema(conn)
+    with conn:
+        counts = rebuild_stats(conn)
+    conn.close()
+    print(f"Rebuilt {len(counts)} counters in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
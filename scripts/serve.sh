@@ -0,0 +1,22 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+echo "== Production runner =="
+
+if ! command -v python3 >/dev/null 2>&1; then
+  echo "ERROR: python3 not found"
+  exit 1
+fi
+
+python3 - <<'PY'
+import flask, gunicorn, reportlab
+print(f"Imports OK: flask, gunicorn {gunicorn.__version__}, reportlab")
+PY
+
+export APP_HOST="${APP_HOST:-127.0.0.1}"
+export APP_PORT="${APP_PORT:-8000}"
+
+echo "Starting gunicorn on http://${APP_HOST}:${APP_PORT} (workers=${WEB_WORKERS:-auto}, threads=${WEB_THREADS:-8})"
+echo "Reload: make reload | Stop: make stop | Ready: GET /ready"
+
+exec python3 -m gunicorn -c gunicorn.conf.py app:app
@@ -60,6 +60,124 @@ def call_iso(text: str) -> dict:
     r.raise_for_status()
     return r.json()
 
+def expect(cond: bool, msg: str) -> int:
+    if cond:
+        return 0
+    print("FAIL:", msg)
+    return 1
+
+def check_batch() -> int:
+    print("\n--- /iso/batch per-item errors ---")
+    r = requests.post(f"{BASE}/iso/batch", json=[TEST_LEADS[0]["text"], "   ", 42], timeout=180)
+    if expect(r.status_code == 200, f"/iso/batch status {r.status_code}"):
+        return 1
+    out = r.json()
+    results = out.get("results", [])
+    print("count:", out.get("count"), "| stored:", out.get("stored"), "| errors:", out.get("errors"))
+
+    failures = expect(out.get("count") == 3 and len(results) == 3, "batch should return 3 results")
+    failures += expect(out.get("errors") == 2, f"errors {out.get('errors')} != 2")
+    if len(results) == 3:
+        failures += expect("lead_score" in results[0], "valid item has no lead_score")
+        for index in (1, 2):
+            item = results[index]
+            failures += expect(item.get("index") == index and "error" in item,
+                               f"item {index} is not a per-item error: {item}")
+
+    r = requests.post(f"{BASE}/iso/batch", json={"texts": "geen lijst"}, timeout=30)
+    failures += expect(r.status_code == 400 and "error" in r.json(), f"malformed batch status {r.status_code}")
+    return failures
+
+def check_listing() -> int:
+    print("\n--- /leads paging + revalidation ---")
+    r = requests.get(f"{BASE}/leads", params={"limit": 2}, timeout=30)
+    if expect(r.status_code == 200, f"/leads status {r.status_code}"):
+        return 1
+    first = r.json()
+    cursor = r.headers.get("X-Next-Cursor")
+    etag = r.headers.get("ETag")
+    print("page 1:", len(first), "| next cursor:", bool(cursor), "| etag:", etag)
+
+    failures = expect(isinstance(first, list) and len(first) == 2, "page 1 should hold 2 leads")
+    failures += expect(all("reference_id" in lead and "lead_score" in lead for lead in first),
+                       "leads are missing reference_id/lead_score")
+    failures += expect(bool(cursor), "no X-Next-Cursor header")
+
+    if cursor:
+        r = requests.get(f"{BASE}/leads", params={"limit": 2, "cursor": cursor}, timeout=30)
+        failures += expect(r.status_code == 200, f"/leads?cursor status {r.status_code}")
+        if r.status_code == 200:
+            second = r.json()
+            seen = {lead["reference_id"] for lead in first}
+            failures += expect(0 < len(second) <= 2, "page 2 is empty")
+            failures += expect(not any(lead["reference_id"] in seen for lead in second),
+                               "page 2 repeats leads from page 1")
+
+    failures += expect(bool(etag), "no ETag on /leads")
+    if etag:
+        r = requests.get(f"{BASE}/leads", params={"limit": 2}, headers={"If-None-Match": etag}, timeout=30)
+        failures += expect(r.status_code == 304, f"revalidation status {r.status_code} != 304")
+
+    r = requests.get(f"{BASE}/leads", params={"cursor": "kapot"}, timeout=30)
+    failures += expect(r.status_code == 400, f"bad cursor status {r.status_code} != 400")
+    return failures
+
+def check_stats() -> int:
+    print("\n--- /leads/stats ---")
+    r = requests.get(f"{BASE}/leads/stats", timeout=30)
+    if expect(r.status_code == 200, f"/leads/stats status {r.status_code}"):
+        return 1
+    stats = r.json()
+    print("total:", stats.get("total"), "| kans:", stats.get("commerciele_kans"))
+
+    failures = expect(isinstance(stats.get("total"), int) and stats["total"] > 0, "total should be > 0")
+    for name, kind in (("commerciele_kans", dict), ("iso_norm", dict), ("lead_score", list), ("per_day", list)):
+        failures += expect(isinstance(stats.get(name), kind), f"stats.{name} is not a {kind.__name__}")
+    if isinstance(stats.get("lead_score"), list):
+        failures += expect(sum(b["count"] for b in stats["lead_score"]) == stats.get("total"),
+                           "score histogram does not add up to total")
+    return failures
+
+def check_search() -> int:
+    print("\n--- /leads/search ---")
+    r = requests.get(f"{BASE}/leads/search", params={"q": "certificering", "limit": 5}, timeout=30)
+    if expect(r.status_code == 200, f"/leads/search status {r.status_code}"):
+        return 1
+    hits = r.json()
+    print("hits:", len(hits))
+
+    failures = expect(isinstance(hits, list) and len(hits) > 0, "no hits for 'certificering'")
+    failures += expect(all("reference_id" in h and "snippet" in h and "rank" in h for h in hits),
+                       "hits are missing reference_id/snippet/rank")
+
+    r = requests.get(f"{BASE}/leads/search", timeout=30)
+    failures += expect(r.status_code == 400, f"search without q status {r.status_code} != 400")
+    return failures
+
+def check_export() -> int:
+    print("\n--- /leads/export ---")
+    failures = 0
+
+    r = requests.get(f"{BASE}/leads/export", params={"format": "ndjson"}, timeout=60)
+    if expect(r.status_code == 200, f"/leads/export ndjson status {r.status_code}"):
+        return 1
+    rows = [json.loads(line) for line in r.text.splitlines() if line.strip()]
+    watermark = r.headers.get("X-Export-Watermark", "")
+    print("ndjson rows:", len(rows), "| watermark:", watermark)
+    failures += expect(len(rows) > 0, "ndjson export is empty")
+    failures += expect(all("id" in row and "reference_id" in row for row in rows), "ndjson rows are missing id/reference_id")
+    failures += expect(watermark.isdigit() and all(row["id"] <= int(watermark) for row in rows),
+                       "rows beyond X-Export-Watermark")
+
+    r = requests.get(f"{BASE}/leads/export", params={"format": "csv", "gzip": 1}, timeout=60)
+    header = r.text.split("\n", 1)[0]
+    failures += expect(r.status_code == 200 and header.startswith("id,reference_id,"),
+                       f"csv export status {r.status_code}, header {header[:40]!r}")
+
+    r = requests.get(f"{BASE}/leads/export", params={"format": "xml"}, timeout=30)
+    failures += expect(r.status_code == 400, f"unknown format status {r.status_code} != 400")
+    return failures
+
 def main():
     print("== Smoke test ==")
     print("Checking server...")
@@ -98,6 +216,12 @@ def main():
                     failures += 1
                     print(f"FAIL: iso_norm does not contain '{must}'")
 
+    failures += check_batch()
+    failures += check_listing()
+    failures += check_stats()
+    failures += check_search()
+    failures += check_export()
+
     print("\n== Result ==")
     if failures == 0:
         print("ALL TESTS PASSED ✅")
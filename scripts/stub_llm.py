@@ -0,0 +1,166 @@
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Minimal OpenAI-compatible chat completions server for offline runs and
+# tests of terminal_agent:
+#   python3 scripts/stub_llm.py --port 8765
+#   AGENT_PLANNER_URL=http://127.0.0.1:8765/v1 python3 terminal_agent.py "..."
+#
+# Planning prompts get a canned plan chosen by keywords in the goal, lead
+# enrichment prompts (enrichment.py) a score one above the rule score, and
+# any other prompt a short deterministic summary of the text it was sent.
+
+PLANS = (
+    (("smoke", "test"), {
+        "summary": "Run the smoke tests against the running server.",
+        "commands": [{"cmd": "python3 scripts/smoke_test.py", "rationale": "Run the smoke tests", "independent": False}],
+        "notes": "stub planner",
+    }),
+    (("bench",), {
+        "summary": "Run the analyse_lead microbenchmarks.",
+        "commands": [{"cmd": "make bench", "rationale": "Offline microbenchmarks", "independent": False}],
+        "notes": "stub planner",
+    }),
+)
+
+DEFAULT_PLAN = {
+    "summary": "Inspect the project.",
+    "commands": [
+        {"cmd": "pwd", "rationale": "Show the project root", "independent": True},
+        {"cmd": "ls", "rationale": "List project files", "independent": True},
+    ],
+    "notes": "stub planner",
+}
+
+stats = {"requests": 0, "plans": 0, "enrichments": 0, "summaries": 0}
+stats_lock = threading.Lock()
+
+
+def plan_for(goal):
+    lowered = goal.lower()
+    for keywords, plan in PLANS:
+        if any(k in lowered for k in keywords):
+            return plan
+    return DEFAULT_PLAN
+
+
+def summarize(text):
+    lines = [line for line in text.splitlines() if line.strip()]
+    errors = [line.strip() for line in lines if re.search(r"error|fail|traceback|exception", line, re.I)]
+    summary = f"Stub summary: {len(lines)} lines, {len(errors)} error lines."
+    if errors:
+        summary += f" First: {errors[0][:200]}"
+    return summary
+
+
+def enrich(text):
+    match = re.search(r"Regelscore: (\d+)", text)
+    score = min(10, int(match.group(1)) + 1) if match else 5
+    kans = "Hoog" if score >= 8 else "Gemiddeld" if score >= 5 else "Laag"
+    return {"lead_score": score, "commerciele_kans": kans, "toelichting": "Stub: regelscore plus een."}
+
+
+def kind_of(system):
+    if "Return STRICT JSON" in system:
+        return "plans"
+    if '"lead_score"' in system:
+        return "enrichments"
+    return "summaries"
+
+
+def completion(body):
+    messages = body.get("messages") or []
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+
+    kind = kind_of(system)
+    with stats_lock:
+        stats["requests"] += 1
+        stats[kind] += 1
+
+    if kind == "plans":
+        content = json.dumps(plan_for(user))
+    elif kind == "enrichments":
+        content = json.dumps(enrich(user))
+    else:
+        content = summarize(user)
+
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"stub-{stats['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    delay = 0.0
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/health", "/v1/stats"):
+            with stats_lock:
+                return self._send(200, dict(stats))
+        self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send(404, {"error": {"message": "not found"}})
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": {"message": "invalid JSON"}})
+        if self.delay:
+            time.sleep(self.delay)
+        self._send(200, completion(body))
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            super().log_message(fmt, *args)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="OpenAI-compatible stub LLM for offline terminal_agent runs")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--delay-ms", type=float, default=0, help="artificial latency per completion")
+    p.add_argument("--quiet", action="store_true", help="do not log requests")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    Handler.delay = args.delay_ms / 1000
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.quiet = args.quiet
+    print(f"Stub LLM on http://{args.host}:{args.port}/v1 (AGENT_PLANNER_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
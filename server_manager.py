@@ -0,0 +1,251 @@
+# server_manager.py — managed dev/production server for terminal_agent
+#
+# The server runs in its own process group and its PID is recorded in a
+# pidfile, so a later agent run (or `terminal_agent.py server stop`) can find
+# and stop it. Readiness is probed in-process over HTTP with exponential
+# backoff up to a deadline; a server that is already healthy is reused.
+
+import os
+import json
+import signal
+import socket
+import subprocess
+import time
+import http.client
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+SERVER_CMD = os.environ.get("AGENT_SERVER_CMD", "make run")
+READY_PATH = os.environ.get("AGENT_SERVER_READY_PATH", "/ready")
+READY_TIMEOUT = float(os.environ.get("AGENT_SERVER_READY_TIMEOUT", "30"))
+STOP_TIMEOUT = float(os.environ.get("AGENT_SERVER_STOP_TIMEOUT", "10"))
+
+# Backoff between readiness probes: 25 ms doubling up to 500 ms
+PROBE_FIRST = 0.025
+PROBE_MAX = 0.5
+
+
+def port_open(host: str, port: int, timeout: float = 0.4) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def probe(host: str, port: int, path: str = READY_PATH, timeout: float = 1.0) -> Optional[int]:
+    # HTTP status of one GET, or None when nothing answers
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request("GET", path, headers={"Connection": "close"})
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        # Reap it first if it is our own exited child
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_start(pid: int) -> Optional[str]:
+    # Start time of a live process, or None. Together with the PID it
+    # identifies the process: a reused PID gets a new start time.
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+        # Field 22 (starttime); the command name before it may contain spaces
+        return stat.rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        pass
+    if Path("/proc/self/stat").exists():
+        return None
+    try:
+        out = subprocess.run(["ps", "-o", "lstart=", "-p", str(pid)],
+                             capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out or None
+
+
+def group_alive(pgid: int) -> bool:
+    pid_alive(pgid)
+    try:
+        os.killpg(pgid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ServerManager:
+    """Start, reuse, probe and stop the project server."""
+
+    def __init__(self, root: Path, host: str, port: int, command: str = SERVER_CMD):
+        self.root = Path(root)
+        self.host = host
+        self.port = port
+        self.command = command
+        self.pidfile = self.root / ".agent_server.pid"
+        self.log_path = self.root / ".server.log"
+
+    # -----------------------------
+    # Pidfile
+    # -----------------------------
+    def _read_pidfile(self) -> Optional[Dict[str, Any]]:
+        try:
+            info = json.loads(self.pidfile.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(info, dict) or not isinstance(info.get("pid"), int):
+            return None
+        if not self._is_ours(info):
+            # Stale: the server died or was stopped outside the agent, and
+            # the PID may since belong to an unrelated process
+            self.pidfile.unlink(missing_ok=True)
+            return None
+        return info
+
+    @staticmethod
+    def _is_ours(info: Dict[str, Any]) -> bool:
+        pid = info["pid"]
+        if not group_alive(pid):
+            return False
+        started = process_start(pid)
+        if started is None:
+            # The group leader exited but its group lives on; the kernel
+            # does not hand out a PID still in use as a process group ID
+            return True
+        return started == info.get("pid_start")
+
+    def _write_pidfile(self, info: Dict[str, Any]) -> None:
+        tmp = self.pidfile.with_suffix(".tmp")
+        tmp.write_text(json.dumps(info), encoding="utf-8")
+        os.replace(tmp, self.pidfile)
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def healthy(self) -> bool:
+        return probe(self.host, self.port) == 200
+
+    def status(self) -> Dict[str, Any]:
+        info = self._read_pidfile()
+        return {
+            "managed": info is not None,
+            "pid": info["pid"] if info else None,
+            "command": info["command"] if info else None,
+            "started": info["started"] if info else None,
+            "port_open": port_open(self.host, self.port),
+            "healthy": self.healthy(),
+            "url": f"http://{self.host}:{self.port}",
+        }
+
+    def wait_ready(self, deadline: float, proc: Optional[subprocess.Popen] = None) -> bool:
+        delay = PROBE_FIRST
+        while True:
+            if self.healthy():
+                return True
+            if proc is not None and proc.poll() is not None:
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, PROBE_MAX)
+
+    def start(self, timeout: float = READY_TIMEOUT) -> Dict[str, Any]:
+        started = time.monotonic()
+        deadline = started + timeout
+        info = self._read_pidfile()
+
+        if info is None and self.healthy():
+            return {"reused": True, "ready": True, "pid": None, "ready_s": 0.0,
+                    "detail": "healthy server already running (not started by the agent)"}
+        if info is not None:
+            # Ours and alive: reuse it, waiting if it is still starting up
+            ready = self.wait_ready(deadline)
+            return {"reused": True, "ready": ready, "pid": info["pid"],
+                    "ready_s": round(time.monotonic() - started, 3),
+                    "detail": "managed server" + ("" if ready else " not ready")}
+        if port_open(self.host, self.port):
+            return {"reused": False, "ready": False, "pid": None, "ready_s": 0.0,
+                    "detail": f"port {self.port} is in use by an unhealthy server"}
+
+        with open(self.log_path, "a", encoding="utf-8") as log_f:
+            proc = subprocess.Popen(
+                self.command,
+                shell=True,
+                cwd=str(self.root),
+                stdin=subprocess.DEVNULL,
+                stdout=log_f,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+        self._write_pidfile({
+            "pid": proc.pid,
+            "pid_start": process_start(proc.pid),
+            "command": self.command,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "url": f"http://{self.host}:{self.port}",
+        })
+
+        ready = self.wait_ready(deadline, proc)
+        detail = "started"
+        if not ready:
+            if proc.poll() is not None:
+                detail = f"exited with code {proc.returncode}, see {self.log_path.name}"
+                self.pidfile.unlink(missing_ok=True)
+            else:
+                detail = f"not ready after {timeout:.0f}s, see {self.log_path.name}"
+        return {"reused": False, "ready": ready, "pid": proc.pid,
+                "ready_s": round(time.monotonic() - started, 3), "detail": detail}
+
+    def stop(self, timeout: float = STOP_TIMEOUT) -> Dict[str, Any]:
+        info = self._read_pidfile()
+        if info is None:
+            return {"stopped": False, "pid": None,
+                    "detail": "no managed server" + (" (another server is listening)" if port_open(self.host, self.port) else "")}
+
+        pid = info["pid"]
+        started = time.monotonic()
+        # The whole group: make -> shell -> python/gunicorn and its workers
+        self._signal_group(pid, signal.SIGTERM)
+        forced = False
+        while self._is_ours(info):
+            if time.monotonic() - started > timeout:
+                self._signal_group(pid, signal.SIGKILL)
+                forced = True
+                break
+            time.sleep(0.05)
+        self.pidfile.unlink(missing_ok=True)
+        return {"stopped": True, "pid": pid, "forced": forced,
+                "stop_s": round(time.monotonic() - started, 3),
+                "detail": "killed after timeout" if forced else "stopped"}
+
+    @staticmethod
+    def _signal_group(pid: int, sig: int) -> None:
+        try:
+            os.killpg(pid, sig)
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
@@ -0,0 +1,265 @@
+# session_log.py — append-only session history for terminal_agent
+#
+# Layout (in SESSION_DIR):
+#   current.jsonl              one JSON entry per line, only ever appended to
+#   current.idx                byte offset of every entry, 8 bytes each
+#   segment-<ts>.jsonl.gz      rotated, compressed older segments
+#
+# The index makes "last N entries" two small reads regardless of history
+# size. Appends are single write()s followed by fsync; a line torn by a
+# crash is cut off (and the index rebuilt) the next time the log is opened.
+
+import os
+import gzip
+import json
+import shutil
+import struct
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+MAX_SEGMENT_BYTES = int(os.environ.get("AGENT_SESSION_MAX_BYTES", str(1024 * 1024)))
+MAX_SEGMENT_AGE_DAYS = float(os.environ.get("AGENT_SESSION_MAX_AGE_DAYS", "7"))
+KEEP_SEGMENTS = int(os.environ.get("AGENT_SESSION_KEEP_SEGMENTS", "5"))
+FSYNC = os.environ.get("AGENT_SESSION_FSYNC", "1") in ("1", "true", "True")
+
+OFFSET = struct.Struct("<Q")
+
+
+class SessionLog:
+    """Append-only JSONL history with an offset index and rotation."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.directory / "current.jsonl"
+        self.idx_path = self.directory / "current.idx"
+        self.lock_path = self.directory / ".lock"
+        with self._locked():
+            self._repair()
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+    def append(self, entry: Dict[str, Any]) -> None:
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._locked():
+            if self._should_rotate(len(line)):
+                self._rotate()
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                offset = os.fstat(fd).st_size
+                os.write(fd, line)
+                if FSYNC:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            # The index is written after the entry is durable; a missing
+            # index record is recovered from the log by _repair().
+            with open(self.idx_path, "ab") as idx:
+                idx.write(OFFSET.pack(offset))
+
+    def rotate(self) -> Optional[Path]:
+        with self._locked():
+            return self._rotate()
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+    def __len__(self) -> int:
+        try:
+            return self.idx_path.stat().st_size // OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def tail(self, n: int) -> List[Dict[str, Any]]:
+        if n <= 0:
+            return []
+        entries = self._tail_current(n)
+        if len(entries) < n:
+            # Only right after a rotation: top up from the newest segment
+            segments = self.segments()
+            if segments:
+                older = read_segment(segments[-1])
+                entries = older[-(n - len(entries)):] + entries
+        return entries
+
+    def segments(self) -> List[Path]:
+        return sorted(self.directory.glob("segment-*.jsonl.gz"))
+
+    def iter_all(self):
+        for segment in self.segments():
+            yield from read_segment(segment)
+        yield from self._read_from(0)
+
+    def _tail_current(self, n: int) -> List[Dict[str, Any]]:
+        count = len(self)
+        if count == 0:
+            return []
+        first = max(0, count - n)
+        with open(self.idx_path, "rb") as idx:
+            idx.seek(first * OFFSET.size)
+            (start,) = OFFSET.unpack(idx.read(OFFSET.size))
+        return self._read_from(start)
+
+    def _read_from(self, start: int) -> List[Dict[str, Any]]:
+        if not self.log_path.exists():
+            return []
+        with open(self.log_path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
+
+    # -----------------------------
+    # Rotation / compaction
+    # -----------------------------
+    def _should_rotate(self, incoming: int) -> bool:
+        try:
+            size = self.log_path.stat().st_size
+        except FileNotFoundError:
+            return False
+        if size == 0:
+            return False
+        if size + incoming > MAX_SEGMENT_BYTES:
+            return True
+        if MAX_SEGMENT_AGE_DAYS > 0:
+            first = self._read_first()
+            stamp = first.get("timestamp") if first else None
+            if stamp:
+                try:
+                    return datetime.now() - datetime.fromisoformat(stamp) > timedelta(days=MAX_SEGMENT_AGE_DAYS)
+                except ValueError:
+                    return False
+        return False
+
+    def _read_first(self) -> Optional[Dict[str, Any]]:
+        with open(self.log_path, "rb") as f:
+            line = f.readline()
+        try:
+            return json.loads(line) if line.strip() else None
+        except ValueError:
+            return None
+
+    def _rotate(self) -> Optional[Path]:
+        if not self.log_path.exists() or self.log_path.stat().st_size == 0:
+            return None
+
+        segment = self.directory / f"segment-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.jsonl.gz"
+        tmp = segment.with_suffix(".tmp")
+        with open(self.log_path, "rb") as src, gzip.open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp, segment)
+        self.log_path.unlink()
+        self.idx_path.unlink(missing_ok=True)
+
+        if KEEP_SEGMENTS > 0:
+            for old in self.segments()[:-KEEP_SEGMENTS]:
+                old.unlink()
+        return segment
+
+    # -----------------------------
+    # Crash recovery
+    # -----------------------------
+    def _repair(self) -> None:
+        if not self.log_path.exists():
+            self.idx_path.unlink(missing_ok=True)
+            return
+        if self._consistent():
+            return
+
+        with open(self.log_path, "rb") as f:
+            data = f.read()
+
+        # A torn final line (crash mid-append) is dropped
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            with open(self.log_path, "r+b") as f:
+                f.truncate(end)
+                if FSYNC:
+                    os.fsync(f.fileno())
+            data = data[:end]
+
+        offsets = []
+        position = 0
+        for line in data.split(b"\n")[:-1]:
+            offsets.append(position)
+            position += len(line) + 1
+
+        tmp = self.idx_path.with_suffix(".tmp")
+        tmp.write_bytes(b"".join(OFFSET.pack(o) for o in offsets))
+        os.replace(tmp, self.idx_path)
+
+    def _consistent(self) -> bool:
+        # Cheap check on open: the last indexed entry is exactly the last,
+        # complete line of the log. Anything else triggers a full rebuild.
+        size = self.log_path.stat().st_size
+        try:
+            idx_size = self.idx_path.stat().st_size
+        except FileNotFoundError:
+            return size == 0
+        if idx_size % OFFSET.size or (idx_size == 0) != (size == 0):
+            return False
+        if size == 0:
+            return True
+        with open(self.idx_path, "rb") as idx:
+            idx.seek(idx_size - OFFSET.size)
+            (last,) = OFFSET.unpack(idx.read(OFFSET.size))
+        if last >= size:
+            return False
+        with open(self.log_path, "rb") as f:
+            f.seek(last)
+            tail = f.read()
+        return tail.endswith(b"\n") and tail.count(b"\n") == 1 and (last == 0 or self._newline_before(last))
+
+    def _newline_before(self, offset: int) -> bool:
+        with open(self.log_path, "rb") as f:
+            f.seek(offset - 1)
+            return f.read(1) == b"\n"
+
+    def _locked(self):
+        return _FileLock(self.lock_path)
+
+
+class _FileLock:
+    # Serializes writers across agent processes (no-op where flock is missing)
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+        self._f.close()
+        return False
+
+
+def read_segment(path: Path) -> List[Dict[str, Any]]:
+    with gzip.open(path, "rb") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def migrate_legacy(log: SessionLog, legacy_path: Path) -> int:
+    # One-time import of the old single-file .agent_session.json
+    if not legacy_path.exists():
+        return 0
+    try:
+        history = json.loads(legacy_path.read_text(encoding="utf-8")).get("history", [])
+    except (ValueError, AttributeError):
+        history = []
+    if len(log) == 0 and not log.segments():
+        for entry in history:
+            log.append(entry)
+    legacy_path.rename(legacy_path.with_name(legacy_path.name + ".migrated"))
+    return len(history)
@@ -2,33 +2,54 @@
 # terminal_agent.py — Enterprise Terminal Agent v3
 # - Project-only sandbox
 # - Server auto-detect + healthcheck
-# - Background server start (no hanging)
+# - Managed background server (pidfile, readiness probe, start/stop/status)
 # - Hard-coded preferred workflow for THIS project: make run + scripts/smoke_test.py
 # - Blocks flask run / unittest (wrong for this repo)
-# - Session memory + output summarizer
+# - Session memory + output summarizer (local digest, token budget)
+# - Live streamed command output (bounded), timeouts, opt-in parallel steps
 
 import os
 import sys
 import json
 import shlex
+import signal
 import socket
 import subprocess
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Deque, Optional
 
 from openai import OpenAI
 from rich.console import Console
+from rich.markup import escape
 from rich.panel import Panel
 from rich.prompt import Confirm
 from rich.syntax import Syntax
+from rich.text import Text
+
+from log_digest import SUMMARY_MAX_CHUNKS, SUMMARY_TOKEN_BUDGET, LogDigest, estimate_tokens, map_reduce
+from plan_cache import PlanCache, project_state
+from server_manager import READY_PATH, ServerManager
+from session_log import SessionLog, migrate_legacy
 
 console = Console()
 
 PROJECT_ROOT = Path.cwd()
+SESSION_DIR = PROJECT_ROOT / ".agent_session"
+# Pre-JSONL single-file history, migrated into SESSION_DIR on first start
 SESSION_FILE = PROJECT_ROOT / ".agent_session.json"
-MODEL = "gpt-4o-mini"
+MODEL = os.environ.get("AGENT_MODEL", "gpt-4o-mini")
+
+# Planner backend: any OpenAI-compatible base URL (e.g. scripts/stub_llm.py),
+# or AGENT_OFFLINE=1 for smart plans and cached plans only.
+PLANNER_URL = os.environ.get("AGENT_PLANNER_URL", "")
+OFFLINE = os.environ.get("AGENT_OFFLINE", "0") in ("1", "true", "True")
+PLAN_CACHE_FILE = PROJECT_ROOT / ".agent_plan_cache.json"
 
 # Allowed command prefixes
 ALLOWED_PREFIXES = [
@@ -50,18 +71,18 @@ BLOCKED_TOKENS = {
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 8000
 
-
-def load_session() -> Dict[str, Any]:
-    if SESSION_FILE.exists():
-        try:
-            return json.loads(SESSION_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return {"history": []}
-    return {"history": []}
+# Only the last N lines of each stream are kept; everything is shown live
+OUTPUT_TAIL_LINES = int(os.environ.get("AGENT_OUTPUT_TAIL_LINES", "200"))
+COMMAND_TIMEOUT = float(os.environ.get("AGENT_COMMAND_TIMEOUT", "300"))
+# Opt-in (or --parallel): steps the plan marks "independent" run concurrently
+PARALLEL = os.environ.get("AGENT_PARALLEL", "0") in ("1", "true", "True")
+MAX_PARALLEL = int(os.environ.get("AGENT_MAX_PARALLEL", "4"))
 
 
-def save_session(session: Dict[str, Any]) -> None:
-    SESSION_FILE.write_text(json.dumps(session, indent=2, ensure_ascii=False), encoding="utf-8")
+def load_session() -> SessionLog:
+    session = SessionLog(SESSION_DIR)
+    migrate_legacy(session, SESSION_FILE)
+    return session
 
 
 def is_server_running(host: str = SERVER_HOST, port: int = SERVER_PORT) -> bool:
@@ -73,20 +94,8 @@ def is_server_running(host: str = SERVER_HOST, port: int = SERVER_PORT) -> bool:
         return False
 
 
-def http_status_ok(url: str) -> bool:
-    # Use curl (allowed) to check server responsiveness without extra deps
-    try:
-        p = subprocess.run(
-            f"curl -s -o /dev/null -w '%{{http_code}}' {shlex.quote(url)}",
-            shell=True,
-            cwd=str(PROJECT_ROOT),
-            text=True,
-            capture_output=True,
-        )
-        code = (p.stdout or "").strip()
-        return code == "200"
-    except Exception:
-        return False
+def server_manager() -> ServerManager:
+    return ServerManager(PROJECT_ROOT, SERVER_HOST, SERVER_PORT)
 
 
 def is_allowed(cmd: str) -> bool:
@@ -100,45 +109,124 @@ def is_allowed(cmd: str) -> bool:
     return parts[0] in ALLOWED_PREFIXES
 
 
-def run_command(cmd: str) -> subprocess.CompletedProcess:
-    return subprocess.run(
-        cmd,
-        shell=True,
-        cwd=str(PROJECT_ROOT),
-        text=True,
-        capture_output=True,
-    )
+@dataclass
+class CommandResult:
+    cmd: str
+    returncode: int = 0
+    duration_s: float = 0.0
+    timed_out: bool = False
+    stdout_tail: Deque[str] = field(default_factory=lambda: deque(maxlen=OUTPUT_TAIL_LINES))
+    stderr_tail: Deque[str] = field(default_factory=lambda: deque(maxlen=OUTPUT_TAIL_LINES))
+    stdout_lines: int = 0
+    stderr_lines: int = 0
+    # Every line of both streams, compressed for the summarizer
+    digest: LogDigest = field(default_factory=LogDigest)
+
+    @property
+    def stdout(self) -> str:
+        return tail_text(self.stdout_tail, self.stdout_lines)
+
+    @property
+    def stderr(self) -> str:
+        return tail_text(self.stderr_tail, self.stderr_lines)
+
+
+def tail_text(lines: Deque[str], total: int) -> str:
+    dropped = total - len(lines)
+    head = f"... ({dropped} earlier lines not kept)\n" if dropped > 0 else ""
+    return (head + "\n".join(lines)).strip()
+
+
+def _pump(stream, tail: Deque[str], result: CommandResult, attr: str, prefix: str, style: str) -> None:
+    # One reader per pipe, so a chatty stderr can never block stdout
+    for line in iter(stream.readline, ""):
+        line = line.rstrip("\n")
+        tail.append(line)
+        result.digest.feed(line)
+        setattr(result, attr, getattr(result, attr) + 1)
+        console.print(Text(prefix + line, style=style), markup=False, highlight=False)
+    stream.close()
+
+
+def _kill_group(proc: subprocess.Popen) -> None:
+    # shell=True: the command runs in its own session, signal the whole group
+    for sig, grace in ((signal.SIGTERM, 3), (signal.SIGKILL, None)):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            return
+        if grace is None:
+            return
+        try:
+            proc.wait(timeout=grace)
+            return
+        except subprocess.TimeoutExpired:
+            continue
 
 
-def start_server_background() -> subprocess.Popen:
-    # Start via make run but in background and capture output
-    # Use a log file so we can inspect if needed
-    log_path = PROJECT_ROOT / ".server.log"
-    log_f = open(log_path, "a", encoding="utf-8")
+def run_command(cmd: str, timeout: float = COMMAND_TIMEOUT, label: str = "") -> CommandResult:
+    result = CommandResult(cmd=cmd)
+    prefix = f"[{label}] " if label else "│ "
+    started = time.perf_counter()
+
     proc = subprocess.Popen(
-        "make run",
+        cmd,
         shell=True,
         cwd=str(PROJECT_ROOT),
-        stdout=log_f,
-        stderr=log_f,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
         text=True,
+        errors="replace",
+        bufsize=1,
+        start_new_session=True,
+        # Python children block-buffer a pipe; unbuffered keeps the stream live
+        env={**os.environ, "PYTHONUNBUFFERED": "1"},
     )
-    return proc
-
+    readers = [
+        threading.Thread(target=_pump, args=(proc.stdout, result.stdout_tail, result, "stdout_lines", prefix, "")),
+        threading.Thread(target=_pump, args=(proc.stderr, result.stderr_tail, result, "stderr_lines", prefix, "yellow")),
+    ]
+    for t in readers:
+        t.daemon = True
+        t.start()
 
-def stop_process(proc: subprocess.Popen) -> None:
     try:
-        proc.terminate()
-        proc.wait(timeout=5)
-    except Exception:
-        try:
-            proc.kill()
-        except Exception:
-            pass
-
-
-def build_system_prompt(goal: str, session: Dict[str, Any], server_running: bool) -> str:
-    recent = session.get("history", [])[-6:]
+        result.returncode = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        result.timed_out = True
+        _kill_group(proc)
+        result.returncode = proc.wait()
+    for t in readers:
+        t.join(timeout=5)
+
+    result.duration_s = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_parallel(cmds: List[str], timeout: float = COMMAND_TIMEOUT) -> List[CommandResult]:
+    # Output lines are interleaved live, each tagged with its step number
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_PARALLEL, len(cmds)))) as ex:
+        futures = [ex.submit(run_command, cmd, timeout, str(i)) for i, cmd in enumerate(cmds, start=1)]
+        return [f.result() for f in futures]
+
+
+def plan_groups(validated: List[Dict[str, Any]], parallel: bool) -> List[List[Dict[str, Any]]]:
+    # Consecutive steps marked independent form one concurrent group;
+    # everything else (and everything without --parallel) runs alone, in order.
+    groups: List[List[Dict[str, Any]]] = []
+    open_group = False
+    for item in validated:
+        independent = bool(parallel and item.get("independent") and item["cmd"] != "__START_SERVER_BG__")
+        if independent and open_group:
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+        open_group = independent
+    return groups
+
+
+def build_system_prompt(goal: str, session: SessionLog, server_running: bool) -> str:
+    recent = session.tail(6)
     return f"""
 You are a SAFE terminal assistant for THIS project.
 
@@ -146,7 +234,9 @@ Project root: {PROJECT_ROOT}
 This project uses:
 - Server start: `make run` (Flask via app.py)
 - Tests: `python3 scripts/smoke_test.py`
-- Healthcheck: GET http://{SERVER_HOST}:{SERVER_PORT}/ should return 200
+- Healthcheck: GET http://{SERVER_HOST}:{SERVER_PORT}{READY_PATH} should return 200
+- To start the server, propose the single command `__START_SERVER_BG__`: it
+  starts it in the background (or reuses a healthy one) and waits until ready.
 
 Hard rules:
 - DO NOT use `flask run` or `python -m flask`.
@@ -161,18 +251,21 @@ User goal:
 Recent history:
 {json.dumps(recent, indent=2, ensure_ascii=False)}
 
+Set "independent": true only on commands that neither depend on nor affect
+the commands next to them (e.g. read-only inspection); those may run concurrently.
+
 Return STRICT JSON only:
 {{
   "summary": "one sentence plan",
   "commands": [
-    {{"cmd": "command", "rationale": "why"}}
+    {{"cmd": "command", "rationale": "why", "independent": false}}
   ],
   "notes": "short note"
 }}
 """.strip()
 
 
-def propose_commands(client: OpenAI, goal: str, session: Dict[str, Any], server_running: bool) -> Dict[str, Any]:
+def propose_commands(client: OpenAI, goal: str, session: SessionLog, server_running: bool) -> Dict[str, Any]:
     messages = [
         {"role": "system", "content": build_system_prompt(goal, session, server_running)},
         {"role": "user", "content": goal},
@@ -206,13 +299,32 @@ def ai_summarize_output(client: OpenAI, goal: str, combined_output: str) -> str:
     return resp.choices[0].message.content.strip()
 
 
+def summarize_output(client: OpenAI, goal: str, combined_output: str) -> str:
+    if estimate_tokens(combined_output) <= SUMMARY_TOKEN_BUDGET:
+        return ai_summarize_output(client, goal, combined_output)
+
+    def summarize(text: str, final: bool) -> str:
+        if final:
+            return ai_summarize_output(client, goal, text)
+        resp = client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": "Condense this part of a terminal log: keep errors, failing tests, results and numbers. Be brief."},
+                {"role": "user", "content": f"Goal: {goal}\n\nLog part:\n{text}"},
+            ],
+            temperature=0,
+        )
+        return resp.choices[0].message.content.strip()
+
+    return map_reduce(combined_output, SUMMARY_TOKEN_BUDGET, summarize, MAX_PARALLEL)
+
+
 def smart_plan_if_goal_matches(goal: str, server_running: bool) -> Dict[str, Any]:
     g = goal.lower()
     if ("start" in g and "server" in g and "smoke" in g) or ("run smoke" in g and "server" in g):
         cmds = []
         if not server_running:
-            cmds.append({"cmd": "__START_SERVER_BG__", "rationale": "Start server in background via make run"})
-            cmds.append({"cmd": f"curl -s -o /dev/null -w '%{{http_code}}' http://{SERVER_HOST}:{SERVER_PORT}/", "rationale": "Healthcheck server returns 200"})
+            cmds.append({"cmd": "__START_SERVER_BG__", "rationale": "Start server in background and wait until it is ready"})
         cmds.append({"cmd": "python3 scripts/smoke_test.py", "rationale": "Run the 5 smoke tests"})
         return {
             "summary": "Start server (if needed), verify health, run smoke tests.",
@@ -222,17 +334,60 @@ def smart_plan_if_goal_matches(goal: str, server_running: bool) -> Dict[str, Any
     return {}
 
 
-def main() -> None:
+def make_client() -> Optional[OpenAI]:
+    if OFFLINE:
+        return None
+    if PLANNER_URL:
+        return OpenAI(api_key=os.environ.get("OPENAI_API_KEY") or "local", base_url=PLANNER_URL)
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
-        console.print("[red]ERROR:[/red] OPENAI_API_KEY is not set.")
+        console.print("[red]ERROR:[/red] OPENAI_API_KEY is not set (or set AGENT_PLANNER_URL / AGENT_OFFLINE=1).")
         sys.exit(1)
+    return OpenAI(api_key=api_key)
+
+
+def server_command(action: str) -> None:
+    manager = server_manager()
+    if action == "start":
+        result = manager.start()
+        style = "green" if result["ready"] else "red"
+        verb = "Reused" if result["reused"] else "Started"
+        console.print(Panel(
+            f"{verb} server (pid={result['pid']}): {result['detail']}\n"
+            f"Ready: {result['ready']} after {result['ready_s']:.2f}s\n"
+            f"Log: {manager.log_path}",
+            title=f"[{style}]server start[/{style}]"
+        ))
+        sys.exit(0 if result["ready"] else 1)
+    if action == "stop":
+        result = manager.stop()
+        extra = f" in {result['stop_s']:.2f}s" if result["stopped"] else ""
+        console.print(Panel(f"{result['detail']} (pid={result['pid']}){extra}", title="server stop"))
+        sys.exit(0 if result["stopped"] else 1)
+    if action == "status":
+        status = manager.status()
+        console.print(Panel("\n".join(f"[bold]{k}:[/bold] {v}" for k, v in status.items()), title="server status"))
+        sys.exit(0 if status["healthy"] else 1)
+    console.print("Usage: python3 terminal_agent.py server start|stop|status")
+    sys.exit(2)
+
 
-    if len(sys.argv) < 2:
-        console.print("Usage: python3 terminal_agent.py \"your goal\"")
+def main() -> None:
+    args = sys.argv[1:]
+    if args[:1] == ["server"]:
+        server_command(args[1] if len(args) > 1 else "")
+
+    client = make_client()
+
+    parallel = PARALLEL or "--parallel" in args
+    args = [a for a in args if a != "--parallel"]
+
+    if not args:
+        console.print("Usage: python3 terminal_agent.py [--parallel] \"your goal\"\n"
+                      "       python3 terminal_agent.py server start|stop|status")
         sys.exit(2)
 
-    goal = " ".join(sys.argv[1:]).strip()
+    goal = " ".join(args).strip()
     session = load_session()
     server_running = is_server_running()
 
@@ -241,16 +396,28 @@ def main() -> None:
         title="Terminal Agent"
     ))
 
-    client = OpenAI(api_key=api_key)
-
-    # Prefer hardcoded smart plan for known workflows
+    # Prefer hardcoded smart plan for known workflows, then a cached plan
+    # for this goal in this exact project state, then the planner.
+    plan_started = time.perf_counter()
+    plan_cache = PlanCache(PLAN_CACHE_FILE)
+    cache_key = None
+    source = "smart plan"
     proposal = smart_plan_if_goal_matches(goal, server_running)
     if not proposal:
+        cache_key = PlanCache.key(goal, project_state(PROJECT_ROOT, server_running))
+        proposal = plan_cache.get(cache_key)
+        source = "plan cache"
+    if not proposal:
+        if client is None:
+            console.print(Panel("Offline and no cached plan for this goal in the current project state.", title="[red]No plan[/red]"))
+            sys.exit(5)
         proposal = propose_commands(client, goal, session, server_running)
+        source = "planner " + (PLANNER_URL or MODEL)
+    plan_ms = (time.perf_counter() - plan_started) * 1000
 
     console.print(Panel(
         f"[bold]Plan:[/bold] {proposal.get('summary','')}\n[bold]Notes:[/bold] {proposal.get('notes','')}",
-        title="AI Proposal"
+        title=f"AI Proposal ({source}, {plan_ms:.0f} ms)"
     ))
 
     commands = proposal.get("commands", [])
@@ -266,6 +433,8 @@ def main() -> None:
         if not cmd:
             continue
 
+        independent = item.get("independent") is True
+
         if cmd == "__START_SERVER_BG__":
             validated.append({"cmd": cmd, "rationale": rationale})
             continue
@@ -277,7 +446,11 @@ def main() -> None:
             console.print(Panel(f"[red]Blocked or not allowed command:[/red]\n{cmd}", title="Safety"))
             sys.exit(4)
 
-        validated.append({"cmd": cmd, "rationale": rationale})
+        validated.append({"cmd": cmd, "rationale": rationale, "independent": independent})
+
+    if not validated:
+        console.print("[yellow]No commands to run.[/yellow]")
+        sys.exit(0)
 
     console.print(Syntax(json.dumps(validated, indent=2, ensure_ascii=False), "json"))
 
@@ -286,83 +459,107 @@ def main() -> None:
         sys.exit(0)
 
     combined_parts: List[str] = []
-    server_proc: subprocess.Popen = None
-
-    for i, c in enumerate(validated, start=1):
-        cmd = c["cmd"]
-        rationale = c["rationale"]
-
-        console.print(Panel(f"[bold]{i}. {cmd}[/bold]\n{rationale}", title="Running"))
-
-        if cmd == "__START_SERVER_BG__":
-            server_proc = start_server_background()
-            # Wait up to 10s for server to become healthy
-            url = f"http://{SERVER_HOST}:{SERVER_PORT}/"
-            ok = False
-            for _ in range(20):
-                time.sleep(0.5)
-                if http_status_ok(url):
-                    ok = True
-                    break
-            out = f"Started server in background (pid={server_proc.pid}). Healthcheck: {'OK' if ok else 'NOT READY'}"
-            console.print(Panel(out, title="server"))
+    # Digests share what map-reduce can take in total
+    digest_budget = max(200, SUMMARY_TOKEN_BUDGET * SUMMARY_MAX_CHUNKS // len(validated))
+    server_started = False
+    step = 0
+    run_failed = False
+
+    for group in plan_groups(validated, parallel):
+        first = group[0]
+        step += 1
+
+        if first["cmd"] == "__START_SERVER_BG__":
+            console.print(Panel(f"[bold]{step}. {first['cmd']}[/bold]\n{first['rationale']}", title="Running"))
+            result = server_manager().start()
+            server_started = server_started or (result["ready"] and not result["reused"])
+            verb = "Reused" if result["reused"] else "Started"
+            out = (f"{verb} server in background (pid={result['pid']}): {result['detail']}. "
+                   f"Ready: {'yes' if result['ready'] else 'NO'} after {result['ready_s']:.2f}s")
+            style = "green" if result["ready"] else "red"
+            console.print(Panel(out, title=f"[{style}]server[/{style}]"))
             combined_parts.append(out)
-            session.setdefault("history", []).append({
+            session.append({
                 "timestamp": datetime.now().isoformat(timespec="seconds"),
                 "goal": goal,
-                "command": "make run (background)",
-                "exit_code": 0,
+                "command": "server start (background)",
+                "exit_code": 0 if result["ready"] else 1,
+                "duration_s": result["ready_s"],
+                "reused": result["reused"],
                 "stdout_preview": out[:600],
                 "stderr_preview": "",
             })
-            save_session(session)
+            if not result["ready"]:
+                run_failed = True
+                console.print(Panel("Server did not become ready. Stopping.", title="[red]Stopped[/red]"))
+                break
             continue
 
-        result = run_command(cmd)
-        stdout = (result.stdout or "").strip()
-        stderr = (result.stderr or "").strip()
-
-        if stdout:
-            console.print(Panel(stdout[:4000], title="stdout"))
-        if stderr:
-            console.print(Panel(stderr[:4000], title="[yellow]stderr[/yellow]"))
-
-        combined = f"$ {cmd}\n(exit={result.returncode})\n"
-        if stdout:
-            combined += f"\n[stdout]\n{stdout}\n"
-        if stderr:
-            combined += f"\n[stderr]\n{stderr}\n"
-        combined_parts.append(combined)
-
-        session.setdefault("history", []).append({
-            "timestamp": datetime.now().isoformat(timespec="seconds"),
-            "goal": goal,
-            "command": cmd,
-            "exit_code": result.returncode,
-            "stdout_preview": stdout[:600],
-            "stderr_preview": stderr[:600],
-        })
-        save_session(session)
-
-        if result.returncode != 0:
-            console.print(Panel(f"Command failed with exit code {result.returncode}. Stopping.", title="[red]Stopped[/red]"))
+        if len(group) == 1:
+            console.print(Panel(f"[bold]{step}. {first['cmd']}[/bold]\n{first['rationale']}", title="Running"))
+            results = [run_command(first["cmd"])]
+        else:
+            listing = "\n".join(f"[bold]{i}. {c['cmd']}[/bold] — {c['rationale']}" for i, c in enumerate(group, start=step))
+            console.print(Panel(listing, title=f"Running {len(group)} independent steps in parallel"))
+            results = run_parallel([c["cmd"] for c in group])
+        step += len(group) - 1
+
+        failed = False
+        for result in results:
+            stdout = result.stdout
+            stderr = result.stderr
+            status = "timed out" if result.timed_out else f"exit={result.returncode}"
+            style = "green" if result.returncode == 0 and not result.timed_out else "red"
+            console.print(f"[{style}]{status}[/{style}] in {result.duration_s:.2f}s — {escape(result.cmd)}", highlight=False)
+
+            combined = f"$ {result.cmd}\n({status}, {result.duration_s:.2f}s)\n"
+            digest = result.digest.render(digest_budget)
+            if digest:
+                combined += f"\n{digest}\n"
+            combined_parts.append(combined)
+
+            session.append({
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "goal": goal,
+                "command": result.cmd,
+                "exit_code": result.returncode,
+                "duration_s": result.duration_s,
+                "timed_out": result.timed_out,
+                "parallel": len(group) > 1,
+                # Tails: the end of the output is where results and errors are
+                "stdout_preview": stdout[-600:],
+                "stderr_preview": stderr[-600:],
+            })
+            failed = failed or result.returncode != 0 or result.timed_out
+
+        if failed:
+            run_failed = True
+            console.print(Panel("Command failed or timed out. Stopping.", title="[red]Stopped[/red]"))
             break
 
+    # Only plans that ran cleanly are reused; a cached plan that fails is dropped
+    if cache_key is not None:
+        if run_failed:
+            plan_cache.invalidate(cache_key)
+        elif source.startswith("planner"):
+            plan_cache.put(cache_key, goal, proposal)
+
     combined_output = "\n".join(combined_parts).strip()
 
     # Summarize output and propose next step
-    try:
-        analysis = ai_summarize_output(client, goal, combined_output)
-        console.print(Panel(analysis, title="AI Analysis"))
-    except Exception as e:
-        console.print(Panel(str(e), title="[yellow]AI analysis failed[/yellow]"))
+    if client is not None:
+        try:
+            analysis = summarize_output(client, goal, combined_output)
+            console.print(Panel(analysis, title="AI Analysis"))
+        except Exception as e:
+            console.print(Panel(str(e), title="[yellow]AI analysis failed[/yellow]"))
 
-    # Optional: if we started server in background, keep it running and tell user how to stop
-    if server_proc is not None:
+    # The server keeps running for later runs (which reuse it)
+    if server_started:
         console.print(Panel(
             "Server is running in the background.\n"
-            "To stop it, find PID in .server.log or run: `lsof` is blocked here; easiest is to stop it from the terminal where you started it.\n"
-            "Alternative: restart your terminal session or stop by PID manually (outside this agent).",
+            "Status: python3 terminal_agent.py server status\n"
+            "Stop:   python3 terminal_agent.py server stop",
             title="Note"
         ))
 
@@ -0,0 +1,200 @@
+import os
+import atexit
+import queue
+import threading
+import time
+
+from db import INSERT_LEAD_SQL, pool
+from lead_feed import feed
+from metrics import DB_ROWS, STAGE_SECONDS, registry
+from retention import retention
+
+# Off by default: every request commits its own rows
+WRITE_BEHIND = os.environ.get("LEADS_WRITE_BEHIND", "0") in ("1", "true", "True")
+WRITE_BEHIND_DURABLE = os.environ.get("LEADS_WRITE_BEHIND_DURABLE", "0") in ("1", "true", "True")
+
+WRITE_FLUSH_ROWS = int(os.environ.get("LEADS_WRITE_FLUSH_ROWS", "500"))
+# Extra time to wait for more rows before committing. 0 commits whatever
+# piled up while the previous commit ran, which already groups concurrent
+# requests without adding latency.
+WRITE_FLUSH_MS = float(os.environ.get("LEADS_WRITE_FLUSH_MS", "0"))
+WRITE_QUEUE_MAX = int(os.environ.get("LEADS_WRITE_QUEUE_MAX", "10000"))
+WRITE_WAIT_TIMEOUT = float(os.environ.get("LEADS_WRITE_WAIT_TIMEOUT", "10"))
+
+
+class WriteTicket:
+    """Completion handle for one submission; `wait()` blocks until committed."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.error = None
+        self._done = threading.Event()
+
+    def finish(self, error=None):
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout=WRITE_WAIT_TIMEOUT):
+        if not self._done.wait(timeout):
+            raise TimeoutError("Opslaan duurde te lang")
+        if self.error is not None:
+            raise self.error
+
+
+class LeadWriter:
+    """Group-commits lead inserts from a single writer thread.
+
+    Requests enqueue rows and return; the thread collects submissions until
+    `flush_rows` rows are gathered or nothing more arrives within `flush_ms`,
+    then writes them all in one transaction, so concurrent requests share one
+    commit instead of queueing behind each other's.
+    """
+
+    def __init__(self, flush_rows=WRITE_FLUSH_ROWS, flush_ms=WRITE_FLUSH_MS, max_queue=WRITE_QUEUE_MAX):
+        self.flush_rows = flush_rows
+        self.flush_ms = flush_ms
+
+        self.stats = {
+            "flushes": 0,
+            "rows_written": 0,
+            "errors": 0,
+            "last_flush_rows": 0,
+            "last_flush_ms": None,
+        }
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._stop = False
+        self._thread = None
+        self._pid = None
+
+    # -----------------------------
+    # Producers
+    # -----------------------------
+    def ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Submissions inherited through fork() belong to the parent
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._depth = 0
+            self._stop = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name="lead-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, rows, wait=False):
+        self.ensure_started()
+        ticket = WriteTicket(list(rows))
+        if not ticket.rows:
+            ticket.finish()
+            return ticket
+        with self._lock:
+            self._depth += len(ticket.rows)
+        try:
+            # A full queue blocks the caller: backpressure instead of unbounded memory
+            self._queue.put(ticket, timeout=WRITE_WAIT_TIMEOUT)
+        except queue.Full:
+            with self._lock:
+                self._depth -= len(ticket.rows)
+            raise TimeoutError("Schrijfwachtrij is vol")
+        if wait:
+            ticket.wait()
+        return ticket
+
+    def depth(self):
+        return self._depth
+
+    def stop(self, timeout=10.0):
+        # Drains everything already queued before the thread exits
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    # -----------------------------
+    # Writer thread
+    # -----------------------------
+    def _collect(self, first):
+        tickets = [first]
+        count = len(first.rows)
+        deadline = time.monotonic() + self.flush_ms / 1000
+        while count < self.flush_rows:
+            remaining = deadline - time.monotonic()
+            try:
+                ticket = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if ticket is None:
+                self._stop = True
+                break
+            tickets.append(ticket)
+            count += len(ticket.rows)
+        return tickets
+
+    def _loop(self):
+        with pool.connection() as conn:
+            while True:
+                try:
+                    first = self._queue.get(timeout=0 if self._stop else 1.0)
+                except queue.Empty:
+                    if self._stop:
+                        break
+                    continue
+                if first is None:
+                    self._stop = True
+                    continue
+                self.flush(conn, self._collect(first))
+
+    def flush(self, conn, tickets):
+        started = time.perf_counter()
+        rows = [row for ticket in tickets for row in ticket.rows]
+
+        try:
+            with conn:
+                conn.executemany(INSERT_LEAD_SQL, rows)
+            failed = ()
+        except Exception:
+            # Retry per submission so one bad request does not fail the group
+            failed = []
+            for ticket in tickets:
+                try:
+                    with conn:
+                        conn.executemany(INSERT_LEAD_SQL, ticket.rows)
+                except Exception as e:
+                    ticket.error = e
+                    failed.append(ticket)
+
+        written = len(rows) - sum(len(t.rows) for t in failed)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._depth -= len(rows)
+        self.stats["flushes"] += 1
+        self.stats["rows_written"] += written
+        self.stats["errors"] += len(failed)
+        self.stats["last_flush_rows"] = len(rows)
+        self.stats["last_flush_ms"] = round(elapsed * 1000, 2)
+        STAGE_SECONDS.observe(elapsed, stage="flush")
+        DB_ROWS.inc(written, op="insert")
+
+        for ticket in tickets:
+            ticket.finish(ticket.error)
+        if written:
+            retention.notify_inserted(written)
+            feed.notify()
+
+
+writer = LeadWriter()
+atexit.register(writer.stop)
+
+registry.gauge(
+    "leads_write_queue_rows", "Lead rows waiting for the write-behind flush.", writer.depth)
+registry.counter_callback(
+    "leads_write_flushes_total", "Write-behind group commits.", lambda: writer.stats["flushes"])
+registry.counter_callback(
+    "leads_write_errors_total", "Write-behind submissions that failed to commit.", lambda: writer.stats["errors"])